@@ -0,0 +1,368 @@
+"""End-to-end load test: synthetic updates through the bot's dispatcher.
+
+    python -m benchmarks.replay [--rate 200] [--duration 20] [--latency 0.05] [--jitter 0.02]
+                                [--mix search=50,inline=25,lists=15,setstatus=10]
+                                [--senders 2000] [--base-users 100000] [--backend json]
+                                [--limiter] [--output replay_results.json]
+
+A local aiohttp server stands in for the Bot API (getChatMember, sendMessage,
+sendPhoto, getChat, answerInlineQuery and the other calls the handlers make)
+and answers every call after --latency (+ up to --jitter) seconds. The
+dispatcher from bot.main.build_dispatcher gets a seeded base in a temporary
+directory and is fed pre-built updates at --rate per second, open loop, so
+latency is measured from the moment an update was due, not from when it was
+picked up. The report lists throughput, latency percentiles and Bot API calls
+per update for every update type. The outbound limiter (Telegram's real
+rate limits) is off unless --limiter is given.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.enums import ParseMode
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import Update
+from aiohttp import web
+
+from benchmarks.storage import MODERATOR_IDS, STATUS_WEIGHTS, _user_id, _username, seed
+
+DEFAULT_MIX = "search=50,inline=25,lists=15,setstatus=10"
+NEW_TARGET_SHARE = 0.2  # /setstatus targets not in the base, resolved with getChat
+
+_UPDATE_KIND: ContextVar[str] = ContextVar("replay_update_kind", default="background")
+
+# update kind -> Bot API method -> calls
+OUTBOUND_CALLS: Dict[str, Counter] = {}
+
+
+def _as_int(value: Optional[str], default: int = 1) -> int:
+    if value and value.lstrip("-").isdigit():
+        return int(value)
+    return default
+
+
+class FakeTelegramAPI:
+    """Answers Bot API calls with minimal valid payloads after a fixed delay."""
+
+    def __init__(self, latency: float, jitter: float) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.calls: Counter = Counter()
+        self._message_ids = iter(range(1, sys.maxsize))
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+    def _message(self, chat_id: int, payload: Dict[str, str]) -> Dict[str, object]:
+        message: Dict[str, object] = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+        }
+        if "photo" in payload or "caption" in payload:
+            file_id = f"photo-{abs(hash(payload.get('photo', ''))) % 10_000}"
+            message["photo"] = [{"file_id": file_id, "file_unique_id": file_id, "width": 512, "height": 512}]
+            message["caption"] = payload.get("caption", "")
+        else:
+            message["text"] = payload.get("text", "")
+        return message
+
+    def result(self, method: str, payload: Dict[str, str]) -> object:
+        chat_id = _as_int(payload.get("chat_id"))
+        if method == "getchatmember":
+            user_id = _as_int(payload.get("user_id"))
+            return {"status": "member", "user": {"id": user_id, "is_bot": False, "first_name": "User"}}
+        if method == "getchat":
+            username = str(payload.get("chat_id", "")).lstrip("@")
+            return {
+                "id": 900_000_000 + abs(hash(username)) % 100_000_000,
+                "type": "private",
+                "username": username,
+                "accent_color_id": 0,
+                "max_reaction_count": 0,
+                "accepted_gift_types": {
+                    "unlimited_gifts": False,
+                    "limited_gifts": False,
+                    "unique_gifts": False,
+                    "premium_subscription": False,
+                },
+            }
+        if method in {"sendmessage", "sendphoto", "editmessagetext", "editmessagecaption"}:
+            return self._message(chat_id, payload)
+        if method == "getme":
+            return {"id": 42, "is_bot": True, "first_name": "ZhorikBase", "username": "ZhorikBaseRobot"}
+        return True
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        payload = {key: str(value) for key, value in (await request.post()).items()}
+        self.calls[method] += 1
+        await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        return web.json_response({"ok": True, "result": self.result(method.lower(), payload)})
+
+
+class CallCounter(BaseRequestMiddleware):
+    """Counts Bot API calls by the type of update that caused them."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        OUTBOUND_CALLS.setdefault(_UPDATE_KIND.get(), Counter())[method.__api_method__] += 1
+        return await make_request(bot, method)
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in UPDATE_BUILDERS:
+            raise SystemExit(f"Unknown update type {kind!r}, expected one of {', '.join(UPDATE_BUILDERS)}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+class UpdateFactory:
+    def __init__(self, rng: random.Random, senders: int, base_users: int) -> None:
+        self.rng = rng
+        self.senders = senders
+        self.base_users = base_users
+        self._ids = iter(range(1, sys.maxsize))
+
+    def _user(self, user_id: int) -> Dict[str, object]:
+        return {"id": user_id, "is_bot": False, "first_name": "User", "username": f"sender{user_id}"}
+
+    def _sender(self) -> int:
+        return 500_000_000 + self.rng.randrange(self.senders)
+
+    def _target(self) -> str:
+        index = self.rng.randrange(self.base_users)
+        return f"@{_username(index)}" if _username(index) else f"id{_user_id(index)}"
+
+    def message(self, sender: int, text: str) -> Dict[str, object]:
+        return {
+            "update_id": next(self._ids),
+            "message": {
+                "message_id": next(self._ids),
+                "date": int(time.time()),
+                "chat": {"id": sender, "type": "private"},
+                "from": self._user(sender),
+                "text": text,
+            },
+        }
+
+    def search(self) -> Dict[str, object]:
+        return self.message(self._sender(), self._target())
+
+    def inline(self) -> Dict[str, object]:
+        handle = _username(self.rng.randrange(self.base_users)) or "user_1"
+        return {
+            "update_id": next(self._ids),
+            "inline_query": {
+                "id": str(next(self._ids)),
+                "from": self._user(self._sender()),
+                "query": handle[: self.rng.randint(3, len(handle))],
+                "offset": "",
+            },
+        }
+
+    def lists(self) -> Dict[str, object]:
+        sender = self._sender()
+        return {
+            "update_id": next(self._ids),
+            "callback_query": {
+                "id": str(next(self._ids)),
+                "from": self._user(sender),
+                "chat_instance": "replay",
+                "data": f"list_{self.rng.choice(list(STATUS_WEIGHTS))}",
+                "message": {
+                    "message_id": next(self._ids),
+                    "date": int(time.time()),
+                    "chat": {"id": sender, "type": "private"},
+                    "text": "Списки",
+                },
+            },
+        }
+
+    def setstatus(self) -> Dict[str, object]:
+        moderator = self.rng.choice(MODERATOR_IDS)
+        if self.rng.random() < NEW_TARGET_SHARE:
+            target = f"@new_{self.rng.randrange(10 ** 9)}"
+        else:
+            target = self._target()
+        status = self.rng.choice(list(STATUS_WEIGHTS))
+        return self.message(moderator, f"/setstatus {target} {status} https://t.me/proofs/replay")
+
+
+UPDATE_BUILDERS = {
+    "search": UpdateFactory.search,
+    "inline": UpdateFactory.inline,
+    "lists": UpdateFactory.lists,
+    "setstatus": UpdateFactory.setstatus,
+}
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    samples = sorted(samples)
+
+    def pick(fraction: float) -> float:
+        return round(samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000, 2)
+
+    return {"p50_ms": pick(0.50), "p90_ms": pick(0.90), "p99_ms": pick(0.99), "max_ms": round(samples[-1] * 1000, 2)}
+
+
+async def replay(args: argparse.Namespace) -> Dict[str, object]:
+    # Imported here: these modules read their settings from the environment
+    # that main() prepares.
+    from bot.main import build_dispatcher
+    from bot.utils import notifications
+    from bot.utils.async_db import flush_db
+    from bot.utils.db import ensure_database
+    from bot.utils.outbound import TELEGRAM_POOL_SIZE, OutboundLimiter
+
+    api = FakeTelegramAPI(args.latency, args.jitter)
+    runner = web.AppRunner(api.app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    ensure_database()
+    session = AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{port}"), limit=TELEGRAM_POOL_SIZE)
+    if args.limiter:
+        session.middleware(OutboundLimiter())
+    session.middleware(CallCounter())
+    bot = Bot(token="42:REPLAY", session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    dp = build_dispatcher()
+
+    rng = random.Random(args.seed)
+    factory = UpdateFactory(rng, args.senders, args.base_users)
+    mix = parse_mix(args.mix)
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=int(args.rate * args.duration))
+    updates: List[Tuple[str, Update]] = [(kind, Update.model_validate(UPDATE_BUILDERS[kind](factory))) for kind in kinds]
+
+    latencies: Dict[str, List[float]] = {kind: [] for kind in mix}
+    errors: Counter = Counter()
+    loop = asyncio.get_running_loop()
+
+    async def feed(kind: str, update: Update, due: float) -> None:
+        _UPDATE_KIND.set(kind)
+        try:
+            await dp.feed_update(bot, update)
+        except Exception:
+            errors[kind] += 1
+        latencies[kind].append(loop.time() - due)
+
+    started = loop.time()
+    tasks = []
+    for position, (kind, update) in enumerate(updates):
+        due = started + position / args.rate
+        delay = due - loop.time()
+        if delay > 0.001:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(feed(kind, update, due)))
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - started
+
+    await notifications.drain()
+    await flush_db()
+    await bot.session.close()
+    await runner.cleanup()
+
+    per_kind = {}
+    for kind, samples in latencies.items():
+        calls = OUTBOUND_CALLS.get(kind, Counter())
+        per_kind[kind] = {
+            "updates": len(samples),
+            "errors": errors[kind],
+            **_percentiles(samples),
+            "calls_per_update": {method: round(count / len(samples), 3) for method, count in sorted(calls.items())} if samples else {},
+        }
+    return {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "settings": {
+            key: getattr(args, key)
+            for key in ("rate", "duration", "latency", "jitter", "mix", "senders", "base_users", "backend", "limiter", "seed")
+        },
+        "updates": len(updates),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput": round(len(updates) / elapsed, 1),
+        "latency": _percentiles([sample for samples in latencies.values() for sample in samples]),
+        "by_type": per_kind,
+        "background_calls": dict(OUTBOUND_CALLS.get("background", {})),
+        "api_calls": dict(api.calls),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay synthetic updates through the dispatcher against a fake Bot API.")
+    parser.add_argument("--rate", type=float, default=200.0, help="updates per second offered")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of updates to generate")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake Bot API response time, seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="extra random response time, seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="update types and weights")
+    parser.add_argument("--senders", type=int, default=2000, help="distinct users sending updates")
+    parser.add_argument("--base-users", type=int, default=100_000, help="users in the seeded base")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--limiter", action="store_true", help="pace Bot API calls like production")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, default=Path("replay_results.json"))
+    args = parser.parse_args(argv)
+    parse_mix(args.mix)
+    output = args.output.resolve()
+
+    with tempfile.TemporaryDirectory(prefix="zhorik-replay-") as tmp:
+        # Storage and admin settings are read at import time, so they are set
+        # before any bot module is loaded.
+        os.environ.update(
+            STORAGE_BACKEND=args.backend,
+            DB_PATH=str(Path(tmp) / "database.json"),
+            LOG_DIR=str(Path(tmp) / "moderation_logs"),
+            SQLITE_PATH=str(Path(tmp) / "database.sqlite3"),
+            STATE_BACKEND="memory",
+            DB_SHARED="0",
+            ADMIN_IDS=",".join(str(moderator) for moderator in MODERATOR_IDS),
+        )
+        os.chdir(tmp)
+        seed(args.base_users, args.base_users)
+        report = asyncio.run(replay(args))
+
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(
+        f"{report['updates']} updates in {report['elapsed_seconds']}s: {report['throughput']} updates/s "
+        f"(offered {args.rate}), p50 {report['latency'].get('p50_ms')} ms, p99 {report['latency'].get('p99_ms')} ms"
+    )
+    for kind, stats in report["by_type"].items():
+        calls = ", ".join(f"{method} {count}" for method, count in stats["calls_per_update"].items())
+        print(
+            f"  {kind:<10} {stats['updates']:>7} updates  {stats['errors']:>4} errors  "
+            f"p50 {stats.get('p50_ms')} ms  p99 {stats.get('p99_ms')} ms  calls/update: {calls}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
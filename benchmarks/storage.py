@@ -0,0 +1,291 @@
+"""Storage and rendering microbenchmarks on synthetic bases.
+
+    python -m benchmarks.storage [--sizes 10000,100000,1000000] [--backends json,sqlite]
+                                 [--log-ratio 2] [--ops 2000] [--budget 3]
+                                 [--output bench_results.json] [--compare old.json]
+
+Every (backend, size) case runs in a fresh temporary directory: one
+subprocess seeds database.json and the moderation journal (imported into
+SQLite for that backend), a second one loads the base and times the
+accessors, so its peak RSS is that of a bot holding the base. Inputs come
+from a seeded RNG and are the same for both backends. Results are written
+as JSON; with --compare, ops/s that dropped by more than --threshold
+against an earlier file are listed and the exit status is 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+
+BASE_USER_ID = 100_000_000
+MODERATOR_IDS = [1000 + index for index in range(20)]
+STATUS_WEIGHTS = {"unknown": 40, "verified": 25, "doubtful": 15, "scammer": 15, "guarantor": 4, "team": 1}
+SEED_BATCH = 10_000
+EPOCH = datetime(2024, 1, 1)
+
+
+def _user_id(index: int) -> int:
+    return BASE_USER_ID + index
+
+
+def _username(index: int) -> Optional[str]:
+    # Every tenth user has no username, a few use upper case.
+    if index % 10 == 9:
+        return None
+    return f"User{index}" if index % 7 == 0 else f"user_{index}"
+
+
+def _statuses(rng: random.Random, count: int) -> List[str]:
+    return rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()), k=count)
+
+
+def seed(users: int, logs: int) -> None:
+    """Write database.json and the journal into the current directory."""
+    from bot.utils import db, journal
+
+    rng = random.Random(users)
+    statuses = _statuses(rng, users)
+    data = json.loads(json.dumps(db.DEFAULT_DB))
+    data["users"] = {
+        str(_user_id(index)): {
+            "id": _user_id(index),
+            "username": _username(index),
+            "status": statuses[index],
+            "proof": f"https://t.me/proofs/{index}" if statuses[index] != "unknown" else "",
+            "comment": "жалобы в чате" if statuses[index] == "scammer" else "",
+            "updated_by": rng.choice(MODERATOR_IDS),
+            "updated_at": (EPOCH + timedelta(seconds=index * 30)).isoformat(),
+        }
+        for index in range(users)
+    }
+    data["moderators"] = MODERATOR_IDS
+    db.DB_PATH.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    del data
+
+    codes = list(STATUS_WEIGHTS)
+    for start in range(0, logs, SEED_BATCH):
+        journal.append(
+            {
+                "time": (EPOCH + timedelta(seconds=seq * 15)).isoformat(),
+                "moderator_id": rng.choice(MODERATOR_IDS),
+                "target_id": _user_id(rng.randrange(users)),
+                "old_status": rng.choice(codes),
+                "new_status": rng.choice(codes),
+                "proof": f"https://t.me/proofs/log{seq}",
+                "comment": "",
+            }
+            for seq in range(start, min(start + SEED_BATCH, logs))
+        )
+    journal.close()
+    if db.STORAGE_BACKEND == "sqlite":
+        from bot.utils import sqlite_db
+
+        sqlite_db.import_json()
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _percentile(samples: Sequence[int], fraction: float) -> int:
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def _time_op(func: Callable[[object], object], args: Sequence[object], budget: float) -> Dict[str, float]:
+    samples: List[int] = []
+    deadline = time.perf_counter() + budget
+    for arg in args:
+        started = time.perf_counter_ns()
+        func(arg)
+        samples.append(time.perf_counter_ns() - started)
+        if len(samples) >= 3 and time.perf_counter() > deadline:
+            break
+    total = sum(samples)
+    samples.sort()
+    return {
+        "iterations": len(samples),
+        "ops_per_sec": round(len(samples) / (total / 1e9), 1) if total else 0.0,
+        "mean_us": round(total / len(samples) / 1000, 2),
+        "p50_us": round(_percentile(samples, 0.50) / 1000, 2),
+        "p99_us": round(_percentile(samples, 0.99) / 1000, 2),
+    }
+
+
+def measure(users: int, ops: int, budget: float) -> Dict[str, object]:
+    """Load the seeded base from the current directory and time every accessor."""
+    from bot.utils import db
+    from bot.utils.status import format_status_text, render_profile
+
+    started = time.perf_counter()
+    db.ensure_database()
+    db.stats_by_status()
+    load_seconds = time.perf_counter() - started
+
+    rng = random.Random(users + 1)
+    picks = [rng.randrange(users) for _ in range(ops)]
+    named = [index for index in picks if _username(index)] or [0]
+    queries = []
+    for position, index in enumerate(picks):
+        form = position % 3
+        if form == 0 and _username(index):
+            queries.append(f"@{_username(index)}")
+        elif form == 1:
+            queries.append(f"id{_user_id(index)}")
+        else:
+            queries.append(str(_user_id(index)))
+    profiles = [db.get_user(str(_user_id(index))) for index in picks]
+    codes = list(STATUS_WEIGHTS)
+    new_statuses = _statuses(rng, ops)
+
+    def upsert(position: int) -> None:
+        index = picks[position]
+        db.upsert_user(_user_id(index), _username(index), new_statuses[position], "https://t.me/proofs/new", "", MODERATOR_IDS[0])
+
+    def append(position: int) -> None:
+        db.append_log(
+            {
+                "time": datetime.utcnow().isoformat(),
+                "moderator_id": MODERATOR_IDS[position % len(MODERATOR_IDS)],
+                "target_id": _user_id(picks[position]),
+                "old_status": "unknown",
+                "new_status": new_statuses[position],
+                "proof": "",
+                "comment": "",
+            }
+        )
+
+    results = {
+        "get_user_by_id": _time_op(db.get_user, [str(_user_id(index)) for index in picks], budget),
+        "get_user_by_username": _time_op(db.get_user, [_username(index).upper() for index in named], budget),
+        "resolve_user": _time_op(db.resolve_user, queries, budget),
+        "format_status_text": _time_op(lambda user: format_status_text(user, "query"), profiles, budget),
+        "render_profile": _time_op(render_profile, profiles, budget),
+        "stats_by_status": _time_op(lambda _: db.stats_by_status(), range(ops), budget),
+        "list_users_by_status": _time_op(db.list_users_by_status, [codes[position % len(codes)] for position in range(ops)], budget),
+        "upsert_user": _time_op(upsert, range(ops), budget),
+        "append_log": _time_op(append, range(ops), budget),
+    }
+    started = time.perf_counter()
+    db.flush_db()
+    return {
+        "load_seconds": round(load_seconds, 3),
+        "flush_seconds": round(time.perf_counter() - started, 3),
+        "peak_rss_mb": _peak_rss_mb(),
+        "ops": results,
+    }
+
+
+def _run_worker(stage: str, backend: str, workdir: Path, args: argparse.Namespace, users: int, logs: int) -> str:
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(ROOT),
+        STORAGE_BACKEND=backend,
+        DB_PATH=str(workdir / "database.json"),
+        LOG_DIR=str(workdir / "moderation_logs"),
+        SQLITE_PATH=str(workdir / "database.sqlite3"),
+        DB_SHARED="0",
+    )
+    command = [
+        sys.executable, "-m", "benchmarks.storage", "--worker", stage,
+        "--users", str(users), "--logs", str(logs), "--ops", str(args.ops), "--budget", str(args.budget),
+    ]
+    done = subprocess.run(command, cwd=workdir, env=env, check=True, stdout=subprocess.PIPE, text=True)
+    return done.stdout
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        done = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    except OSError:
+        return None
+    return done.stdout.strip() or None
+
+
+def compare(current: Dict[str, object], baseline_path: Path, threshold: float) -> List[str]:
+    """Ops whose ops/s fell by more than ``threshold`` (a fraction) against the baseline file."""
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    earlier = {(case["backend"], case["users"]): case for case in baseline.get("cases", [])}
+    regressions = []
+    for case in current["cases"]:
+        before = earlier.get((case["backend"], case["users"]))
+        if not before:
+            continue
+        for name, result in case["ops"].items():
+            old = before["ops"].get(name, {}).get("ops_per_sec")
+            if old and result["ops_per_sec"] < old * (1 - threshold):
+                regressions.append(
+                    f"{case['backend']} {case['users']} {name}: {old} -> {result['ops_per_sec']} ops/s"
+                )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark storage accessors and status rendering.")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma separated user counts")
+    parser.add_argument("--backends", default="json,sqlite")
+    parser.add_argument("--log-ratio", type=float, default=2.0, help="log entries per user")
+    parser.add_argument("--ops", type=int, default=2000, help="calls per accessor")
+    parser.add_argument("--budget", type=float, default=3.0, help="seconds per accessor before stopping early")
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+    parser.add_argument("--compare", type=Path, help="earlier results file to check against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed ops/s drop for --compare")
+    parser.add_argument("--worker", choices=["seed", "measure"], help=argparse.SUPPRESS)
+    parser.add_argument("--users", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--logs", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker == "seed":
+        seed(args.users, args.logs)
+        return 0
+    if args.worker == "measure":
+        print(json.dumps(measure(args.users, args.ops, args.budget)))
+        return 0
+
+    report: Dict[str, object] = {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"log_ratio": args.log_ratio, "ops": args.ops, "budget": args.budget},
+        "cases": [],
+    }
+    for backend in args.backends.split(","):
+        for users in (int(size) for size in args.sizes.split(",")):
+            logs = int(users * args.log_ratio)
+            with tempfile.TemporaryDirectory(prefix="zhorik-bench-") as tmp:
+                workdir = Path(tmp)
+                started = time.perf_counter()
+                _run_worker("seed", backend, workdir, args, users, logs)
+                seed_seconds = time.perf_counter() - started
+                result = json.loads(_run_worker("measure", backend, workdir, args, users, logs).splitlines()[-1])
+            case = {"backend": backend, "users": users, "logs": logs, "seed_seconds": round(seed_seconds, 1), **result}
+            report["cases"].append(case)
+            print(f"{backend} {users} users / {logs} logs: load {case['load_seconds']}s, peak RSS {case['peak_rss_mb']} MB")
+            for name, stats in case["ops"].items():
+                print(f"  {name:<22} {stats['ops_per_sec']:>12} ops/s  p50 {stats['p50_us']:>10} us  p99 {stats['p99_us']:>10} us")
+            args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    if args.compare:
+        regressions = compare(report, args.compare, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,35 @@
-import asyncio
 import os
+import secrets
+import tempfile
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 
 from aiogram import Bot, F, Router
 from aiogram.filters import Command, CommandObject
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import BufferedInputFile, CallbackQuery, FSInputFile, InlineKeyboardButton, InlineKeyboardMarkup, Message
 
 from bot.keyboards.admin_panel import admin_panel_keyboard
-from bot.keyboards.subscription import subscription_keyboard
-from bot.utils.checks import ensure_subscription, parse_search_query
-from bot.utils.db import (
+from bot.utils.async_db import (
     add_moderator,
+    append_log,
     delete_status,
     get_admins,
     get_moderators,
     get_statuses,
+    import_statuses,
+    query_logs,
+    remove_moderator,
     resolve_user,
     save_status,
-    seed_admins,
     stats_by_status,
     update_status,
     upsert_user,
+    write_export,
 )
-from bot.utils.logs import build_log, save_log
+from bot.utils import db, notifications, state
+from bot.utils.checks import parse_search_query
+from bot.utils.export import export_filename
+from bot.utils.logs import build_log
 from bot.utils.status import format_status_text
 
 router = Router()
@@ -31,22 +38,25 @@ ADMIN_IDS: List[int] = [123]
 admin_env = os.environ.get("ADMIN_IDS")
 if admin_env:
     ADMIN_IDS = [int(x) for x in admin_env.split(",") if x.strip().isdigit()]
-seed_admins(ADMIN_IDS)
+db.seed_admins(ADMIN_IDS)
+
+
+_ENV_ADMINS = frozenset(ADMIN_IDS)
 
 
 def is_admin(user_id: int) -> bool:
-    return user_id in set(get_admins()) or user_id in ADMIN_IDS
+    return user_id in _ENV_ADMINS or user_id in db.role_table()[1]
 
 
 def is_moderator(user_id: int) -> bool:
-    return user_id in get_moderators() or is_admin(user_id)
+    _, admins, moderators = db.role_table()
+    return user_id in moderators or user_id in admins or user_id in _ENV_ADMINS
 
 
-def notify_admins(message: Message, *parts: str) -> None:
+async def notify_admins(message: Message, *parts: str) -> None:
     text = "".join(parts)
-    targets = set(get_admins()) | set(ADMIN_IDS)
-    for admin_id in targets:
-        asyncio.create_task(message.bot.send_message(admin_id, text))
+    targets = set(await get_admins()) | set(ADMIN_IDS)
+    notifications.enqueue(message.bot, targets, text)
 
 
 async def apply_status_change(
@@ -61,8 +71,8 @@ async def apply_status_change(
     reply_username: Optional[str],
 ) -> Tuple[Optional[Dict[str, object]], Optional[str]]:
     parsed = parse_search_query(target_raw) or target_raw
-    normalized, existing_user = resolve_user(parsed)
-    status_map = get_statuses()
+    normalized, existing_user = await resolve_user(parsed)
+    status_map = await get_statuses()
     if status_code not in status_map:
         return None, "Неизвестная категория статуса. Добавьте её через /addstatus."
 
@@ -103,7 +113,7 @@ async def apply_status_change(
     if not user_id:
         return None, "Не удалось определить ID пользователя."
 
-    update_result = upsert_user(
+    update_result = await upsert_user(
         user_id=user_id,
         username=username,
         status=status_code,
@@ -119,8 +129,8 @@ async def apply_status_change(
         proof=proof,
         comment=comment,
     )
-    save_log(log_entry)
-    notify_admins(
+    await append_log(log_entry)
+    await notify_admins(
         message,
         "📢 Действие модератора:\n",
         f"Модератор: @{message.from_user.username} ({message.from_user.id})\n",
@@ -133,17 +143,19 @@ async def apply_status_change(
     return update_result["user"], None
 
 
-def build_admin_panel_text() -> str:
-    stats = stats_by_status()
-    statuses = get_statuses()
+async def build_admin_panel_text() -> str:
+    stats = await stats_by_status()
+    statuses = await get_statuses()
+    moderators = await get_moderators()
+    admins = await get_admins()
     stats_lines = "\n".join([f"{statuses.get(code, {}).get('title', code)}: {count}" for code, count in stats.items()])
-    moderation_lines = "\n".join([f"• {mid}" for mid in get_moderators()]) or "нет модераторов"
-    admin_lines = "\n".join([f"• {aid}" for aid in get_admins()]) or "нет админов"
+    moderation_lines = "\n".join([f"• {mid}" for mid in moderators]) or "нет модераторов"
+    admin_lines = "\n".join([f"• {aid}" for aid in admins]) or "нет админов"
     return (
         "📊 Панель администратора\n\n"
         f"Пользователи по статусам:\n{stats_lines or 'нет данных'}\n\n"
-        f"Администраторы: {len(get_admins())}\n{admin_lines}\n\n"
-        f"Количество модераторов: {len(get_moderators())}\n{moderation_lines}\n\n"
+        f"Администраторы: {len(admins)}\n{admin_lines}\n\n"
+        f"Количество модераторов: {len(moderators)}\n{moderation_lines}\n\n"
         "Управление через кнопки ниже:\n"
         "• 📊 Обновить панель\n"
         "• 👥 Модераторы: добавить/удалить/список\n"
@@ -154,35 +166,36 @@ def build_admin_panel_text() -> str:
     )
 
 
-PENDING_ACTIONS: Dict[int, str] = {}
+# Admin dialogs waiting for a text reply: user id -> action. A dialog left
+# unanswered expires so stray text is searched again.
+PENDING_ACTION_TTL = 30 * 60
+PENDING_ACTIONS = state.namespace("pending_actions", ttl=PENDING_ACTION_TTL)
 
 
-def set_pending(user_id: int, action: str) -> None:
-    PENDING_ACTIONS[user_id] = action
+async def set_pending(user_id: int, action: str) -> None:
+    await PENDING_ACTIONS.aset(user_id, action)
 
 
-def pop_pending(user_id: int) -> str | None:
-    return PENDING_ACTIONS.pop(user_id, None)
+async def pop_pending(user_id: int) -> str | None:
+    return await PENDING_ACTIONS.apop(user_id, None)
 
 
-def has_pending_action(user_id: int) -> bool:
-    return user_id in PENDING_ACTIONS
+async def has_pending_action(user_id: int) -> bool:
+    return await PENDING_ACTIONS.acontains(user_id)
 
 
-@router.message(F.text, lambda message: message.from_user and message.from_user.id in PENDING_ACTIONS)
-async def handle_pending_actions(message: Message) -> None:
-    action = PENDING_ACTIONS.get(message.from_user.id)
-    if not action:
-        return
-    subscribed, _ = await ensure_subscription(message.bot, message.from_user)
-    if not subscribed:
-        await message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
+async def pending_action_filter(message: Message) -> Dict[str, str] | bool:
+    """Passes messages from users with an open dialog, handing the action to the handler."""
+    if not message.from_user:
+        return False
+    action = await PENDING_ACTIONS.aget(message.from_user.id)
+    return {"action": action} if action else False
+
+
+@router.message(F.text, pending_action_filter)
+async def handle_pending_actions(message: Message, action: str) -> None:
     if not is_admin(message.from_user.id):
-        pop_pending(message.from_user.id)
+        await pop_pending(message.from_user.id)
         await message.answer("Недостаточно прав.")
         return
 
@@ -192,8 +205,8 @@ async def handle_pending_actions(message: Message) -> None:
             await message.answer("Введите числовой ID модератора.")
             return
         mod_id = int(text)
-        add_moderator(mod_id)
-        pop_pending(message.from_user.id)
+        await add_moderator(mod_id)
+        await pop_pending(message.from_user.id)
         await message.answer(f"Модератор {mod_id} добавлен.")
         return
 
@@ -202,10 +215,8 @@ async def handle_pending_actions(message: Message) -> None:
             await message.answer("Введите числовой ID модератора.")
             return
         mod_id = int(text)
-        from bot.utils.db import remove_moderator
-
-        removed = remove_moderator(mod_id)
-        pop_pending(message.from_user.id)
+        removed = await remove_moderator(mod_id)
+        await pop_pending(message.from_user.id)
         if removed:
             await message.answer(f"Модератор {mod_id} удален.")
         else:
@@ -217,8 +228,8 @@ async def handle_pending_actions(message: Message) -> None:
             await message.answer("Форма: code;title;photo;description")
             return
         code, title, photo, description = [part.strip() for part in text.split(";", 3)]
-        save_status(code, title, description, photo)
-        pop_pending(message.from_user.id)
+        await save_status(code, title, description, photo)
+        await pop_pending(message.from_user.id)
         await message.answer(f"Статус {title} добавлен.")
         return
 
@@ -231,8 +242,8 @@ async def handle_pending_actions(message: Message) -> None:
         if field not in {"title", "photo", "description"}:
             await message.answer("Поле должно быть title, photo или description.")
             return
-        updated = update_status(code, **{field: value})
-        pop_pending(message.from_user.id)
+        updated = await update_status(code, **{field: value})
+        await pop_pending(message.from_user.id)
         if updated:
             await message.answer("Статус обновлен.")
         else:
@@ -241,8 +252,8 @@ async def handle_pending_actions(message: Message) -> None:
 
     if action == "delstatus":
         code = text
-        removed = delete_status(code)
-        pop_pending(message.from_user.id)
+        removed = await delete_status(code)
+        await pop_pending(message.from_user.id)
         if removed:
             await message.answer("Статус удален.")
         else:
@@ -272,50 +283,29 @@ async def handle_pending_actions(message: Message) -> None:
         if error:
             await message.answer(error)
             return
-        pop_pending(message.from_user.id)
+        await pop_pending(message.from_user.id)
         await message.answer(format_status_text(user, target_raw))
         return
 
 
 @router.message(Command("admin"))
 async def handle_admin(message: Message) -> None:
-    subscribed, _ = await ensure_subscription(message.bot, message.from_user)
-    if not subscribed:
-        await message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_admin(message.from_user.id):
         await message.answer("Команда доступна только админам.")
         return
-    await message.answer(build_admin_panel_text(), reply_markup=admin_panel_keyboard())
+    await message.answer(await build_admin_panel_text(), reply_markup=admin_panel_keyboard())
 
 
 @router.callback_query(F.data == "menu_admin")
 async def handle_menu_admin(call: CallbackQuery) -> None:
-    subscribed, _ = await ensure_subscription(call.bot, call.from_user)
-    if not subscribed:
-        await call.message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_admin(call.from_user.id):
         await call.message.answer("Команда доступна только админам.")
         return
-    await call.message.answer(build_admin_panel_text(), reply_markup=admin_panel_keyboard())
+    await call.message.answer(await build_admin_panel_text(), reply_markup=admin_panel_keyboard())
 
 
 @router.message(Command("addmod"))
 async def handle_addmod(message: Message, command: CommandObject) -> None:
-    subscribed, _ = await ensure_subscription(message.bot, message.from_user)
-    if not subscribed:
-        await message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_admin(message.from_user.id):
         await message.answer("Только админы могут управлять модераторами.")
         return
@@ -323,19 +313,12 @@ async def handle_addmod(message: Message, command: CommandObject) -> None:
         await message.answer("Укажите ID модератора: /addmod 123456")
         return
     mod_id = int(command.args.strip())
-    add_moderator(mod_id)
+    await add_moderator(mod_id)
     await message.answer(f"Модератор {mod_id} добавлен.")
 
 
 @router.message(Command("delmod"))
 async def handle_delmod(message: Message, command: CommandObject) -> None:
-    subscribed, _ = await ensure_subscription(message.bot, message.from_user)
-    if not subscribed:
-        await message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_admin(message.from_user.id):
         await message.answer("Только админы могут управлять модераторами.")
         return
@@ -343,9 +326,7 @@ async def handle_delmod(message: Message, command: CommandObject) -> None:
         await message.answer("Укажите ID модератора: /delmod 123456")
         return
     mod_id = int(command.args.strip())
-    from bot.utils.db import remove_moderator
-
-    removed = remove_moderator(mod_id)
+    removed = await remove_moderator(mod_id)
     if removed:
         await message.answer(f"Модератор {mod_id} удален.")
     else:
@@ -354,78 +335,43 @@ async def handle_delmod(message: Message, command: CommandObject) -> None:
 
 @router.callback_query(F.data == "admin_mods")
 async def handle_admin_mods(call: CallbackQuery) -> None:
-    subscribed, _ = await ensure_subscription(call.bot, call.from_user)
-    if not subscribed:
-        await call.message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_admin(call.from_user.id):
         await call.message.answer("Недостаточно прав.")
         return
-    mods = get_moderators()
+    mods = await get_moderators()
     text = "Модераторы:\n" + "\n".join([f"• {mid}" for mid in mods]) if mods else "Список модераторов пуст."
     await call.message.answer(text)
 
 
 @router.callback_query(F.data == "admin_addmod")
 async def handle_admin_addmod_prompt(call: CallbackQuery) -> None:
-    subscribed, _ = await ensure_subscription(call.bot, call.from_user)
-    if not subscribed:
-        await call.message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_admin(call.from_user.id):
         await call.message.answer("Недостаточно прав.")
         return
-    set_pending(call.from_user.id, "addmod")
+    await set_pending(call.from_user.id, "addmod")
     await call.message.answer("Введите ID модератора в ответ на это сообщение.")
 
 
 @router.callback_query(F.data == "admin_delmod")
 async def handle_admin_delmod_prompt(call: CallbackQuery) -> None:
-    subscribed, _ = await ensure_subscription(call.bot, call.from_user)
-    if not subscribed:
-        await call.message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_admin(call.from_user.id):
         await call.message.answer("Недостаточно прав.")
         return
-    set_pending(call.from_user.id, "delmod")
+    await set_pending(call.from_user.id, "delmod")
     await call.message.answer("Введите ID модератора для удаления.")
 
 
 @router.message(Command("listmods"))
 async def handle_listmods(message: Message) -> None:
-    subscribed, _ = await ensure_subscription(message.bot, message.from_user)
-    if not subscribed:
-        await message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_admin(message.from_user.id):
         await message.answer("Только админы могут управлять модераторами.")
         return
-    mods = get_moderators()
+    mods = await get_moderators()
     await message.answer("Модераторы:\n" + "\n".join([f"• {mid}" for mid in mods]) if mods else "Список модераторов пуст.")
 
 
 @router.message(Command("addstatus"))
 async def handle_addstatus(message: Message, command: CommandObject) -> None:
-    subscribed, _ = await ensure_subscription(message.bot, message.from_user)
-    if not subscribed:
-        await message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_admin(message.from_user.id):
         await message.answer("Недостаточно прав.")
         return
@@ -433,19 +379,12 @@ async def handle_addstatus(message: Message, command: CommandObject) -> None:
         await message.answer("Формат: /addstatus code;title;photo;description")
         return
     code, title, photo, description = [part.strip() for part in command.args.split(";", 3)]
-    save_status(code, title, description, photo)
+    await save_status(code, title, description, photo)
     await message.answer(f"Статус {title} добавлен.")
 
 
 @router.message(Command("editstatus"))
 async def handle_editstatus(message: Message, command: CommandObject) -> None:
-    subscribed, _ = await ensure_subscription(message.bot, message.from_user)
-    if not subscribed:
-        await message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_admin(message.from_user.id):
         await message.answer("Недостаточно прав.")
         return
@@ -458,7 +397,7 @@ async def handle_editstatus(message: Message, command: CommandObject) -> None:
     if field not in {"title", "photo", "description"}:
         await message.answer("Поле должно быть title, photo или description.")
         return
-    updated = update_status(code, **kwargs)
+    updated = await update_status(code, **kwargs)
     if updated:
         await message.answer("Статус обновлен.")
     else:
@@ -467,13 +406,6 @@ async def handle_editstatus(message: Message, command: CommandObject) -> None:
 
 @router.message(Command("delstatus"))
 async def handle_delstatus(message: Message, command: CommandObject) -> None:
-    subscribed, _ = await ensure_subscription(message.bot, message.from_user)
-    if not subscribed:
-        await message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_admin(message.from_user.id):
         await message.answer("Недостаточно прав.")
         return
@@ -481,7 +413,7 @@ async def handle_delstatus(message: Message, command: CommandObject) -> None:
         await message.answer("Укажите код статуса: /delstatus verified")
         return
     code = command.args.strip()
-    removed = delete_status(code)
+    removed = await delete_status(code)
     if removed:
         await message.answer("Статус удален.")
     else:
@@ -490,17 +422,10 @@ async def handle_delstatus(message: Message, command: CommandObject) -> None:
 
 @router.callback_query(F.data == "admin_statuses")
 async def handle_admin_statuses(call: CallbackQuery) -> None:
-    subscribed, _ = await ensure_subscription(call.bot, call.from_user)
-    if not subscribed:
-        await call.message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_admin(call.from_user.id):
         await call.message.answer("Недостаточно прав.")
         return
-    statuses = get_statuses()
+    statuses = await get_statuses()
     if not statuses:
         await call.message.answer("Статусы не найдены.")
         return
@@ -512,65 +437,37 @@ async def handle_admin_statuses(call: CallbackQuery) -> None:
 
 @router.callback_query(F.data == "admin_addstatus")
 async def handle_admin_addstatus_prompt(call: CallbackQuery) -> None:
-    subscribed, _ = await ensure_subscription(call.bot, call.from_user)
-    if not subscribed:
-        await call.message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_admin(call.from_user.id):
         await call.message.answer("Недостаточно прав.")
         return
-    set_pending(call.from_user.id, "addstatus")
+    await set_pending(call.from_user.id, "addstatus")
     await call.message.answer("Введите новую категорию: code;title;photo;description")
 
 
 @router.callback_query(F.data == "admin_editstatus")
 async def handle_admin_editstatus_prompt(call: CallbackQuery) -> None:
-    subscribed, _ = await ensure_subscription(call.bot, call.from_user)
-    if not subscribed:
-        await call.message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_admin(call.from_user.id):
         await call.message.answer("Недостаточно прав.")
         return
-    set_pending(call.from_user.id, "editstatus")
+    await set_pending(call.from_user.id, "editstatus")
     await call.message.answer("Введите данные: code field value (field = title|photo|description)")
 
 
 @router.callback_query(F.data == "admin_delstatus")
 async def handle_admin_delstatus_prompt(call: CallbackQuery) -> None:
-    subscribed, _ = await ensure_subscription(call.bot, call.from_user)
-    if not subscribed:
-        await call.message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_admin(call.from_user.id):
         await call.message.answer("Недостаточно прав.")
         return
-    set_pending(call.from_user.id, "delstatus")
+    await set_pending(call.from_user.id, "delstatus")
     await call.message.answer("Введите код статуса для удаления.")
 
 
 @router.callback_query(F.data == "admin_setstatus")
 async def handle_admin_setstatus_prompt(call: CallbackQuery) -> None:
-    subscribed, _ = await ensure_subscription(call.bot, call.from_user)
-    if not subscribed:
-        await call.message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_moderator(call.from_user.id):
         await call.message.answer("Команда доступна модераторам и админам.")
         return
-    set_pending(call.from_user.id, "setstatus")
+    await set_pending(call.from_user.id, "setstatus")
     await call.message.answer("Введите: target status [proof] [comment]")
 
 
@@ -579,13 +476,6 @@ async def handle_setstatus(message: Message, command: CommandObject) -> None:
     if not is_moderator(message.from_user.id):
         await message.answer("Команда доступна модераторам и админам.")
         return
-    subscribed, _ = await ensure_subscription(message.bot, message.from_user)
-    if not subscribed:
-        await message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not command.args or len(command.args.split()) < 2:
         await message.answer("Формат: /setstatus target status [proof] [comment]")
         return
@@ -611,82 +501,304 @@ async def handle_setstatus(message: Message, command: CommandObject) -> None:
     await message.answer(format_status_text(user, target_raw))
 
 
-@router.message(Command("logs"))
-async def handle_logs(message: Message) -> None:
-    subscribed, _ = await ensure_subscription(message.bot, message.from_user)
-    if not subscribed:
+IMPORT_FILE_MAX_BYTES = 20 * 1024 * 1024  # Bot API download limit
+IMPORT_REJECTED_INLINE = 20
+
+
+def format_import_report(report: Dict[str, object]) -> str:
+    rejected = report["rejected"]
+    changes = "\n".join(f"• {transition}: {count}" for transition, count in report["changes"].items())
+    lines = [
+        "📥 Импорт статусов завершен.",
+        f"Применено: {report['applied']}",
+        f"Отклонено: {len(rejected)}",
+    ]
+    if changes:
+        lines.append(f"Изменения:\n{changes}")
+    if report.get("error"):
+        lines.append(f"Файл не импортирован: {report['error']}.")
+    elif report["truncated"]:
+        lines.append("Файл обрезан: превышен лимит строк.")
+    return "\n".join(lines)
+
+
+@router.message(Command("import"))
+async def handle_import(message: Message) -> None:
+    if not is_admin(message.from_user.id):
+        await message.answer("Недостаточно прав.")
+        return
+    document = message.document or (message.reply_to_message.document if message.reply_to_message else None)
+    if not document:
         await message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
+            "Отправьте CSV, JSON или JSONL файл с подписью /import (или ответьте /import на файл).\n"
+            "Колонки: id, username, status, proof, comment"
         )
         return
+    if document.file_size and document.file_size > IMPORT_FILE_MAX_BYTES:
+        await message.answer("Файл слишком большой (максимум 20 МБ).")
+        return
+
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as buffer:
+        await message.bot.download(document, destination=buffer)
+        buffer.seek(0)
+        report = await import_statuses(buffer, document.file_name or "", message.from_user.id)
+
+    summary = format_import_report(report)
+    rejected = report["rejected"]
+    rejected_lines = [f"строка {number}: {reason}" for number, reason in rejected]
+    if len(rejected_lines) > IMPORT_REJECTED_INLINE:
+        await message.answer_document(
+            BufferedInputFile("\n".join(rejected_lines).encode("utf-8"), filename="rejected.txt"),
+            caption=summary,
+        )
+    elif rejected_lines:
+        await message.answer(summary + "\n\nОтклоненные строки:\n" + "\n".join(rejected_lines))
+    else:
+        await message.answer(summary)
+    if report["applied"]:
+        await notify_admins(
+            message,
+            "📢 Массовый импорт статусов:\n",
+            f"Админ: @{message.from_user.username} ({message.from_user.id})\n",
+            f"Файл: {document.file_name or '—'}\n",
+            summary,
+        )
+
+
+EXPORT_FILE_MAX_BYTES = 50 * 1024 * 1024  # Bot API upload limit
+EXPORT_USAGE = "Формат: /export users [status] [csv|jsonl] [gz] или /export logs [csv|jsonl] [gz]"
+
+
+@router.message(Command("export"))
+async def handle_export(message: Message, command: CommandObject) -> None:
     if not is_admin(message.from_user.id):
         await message.answer("Недостаточно прав.")
         return
-    from bot.utils.db import get_log_entries
+    args = (command.args or "users").split()
+    kind = args[0].lower()
+    if kind not in {"users", "logs"}:
+        await message.answer(EXPORT_USAGE)
+        return
+    fmt, compress, status_code = "csv", False, None
+    for arg in args[1:]:
+        if arg.lower() in {"csv", "jsonl"}:
+            fmt = arg.lower()
+        elif arg.lower() in {"gz", "gzip"}:
+            compress = True
+        elif kind == "users" and status_code is None:
+            status_code = arg
+        else:
+            await message.answer(EXPORT_USAGE)
+            return
+    if status_code and status_code not in await get_statuses():
+        await message.answer("Неизвестная категория статуса.")
+        return
 
-    entries = get_log_entries()
-    if not entries:
-        await message.answer("Логи пусты.")
-        return
-    last_entries = entries[-10:]
-    lines = []
-    for entry in last_entries:
-        lines.append(
-            "📒 Log:\n"
-            f"• Модератор: {entry['moderator_id']}\n"
-            f"• Кому: {entry['target_id']}\n"
-            f"• Старый статус → Новый статус: {entry['old_status']} → {entry['new_status']}\n"
-            f"• Пруф: {entry.get('proof', '—')}\n"
-            f"• Комментарий: {entry.get('comment', '—')}\n"
-            f"• Время: {entry['time']}"
+    await message.answer("⏳ Готовлю выгрузку...")
+    path, count = await write_export(kind, status_code, fmt, compress)
+    try:
+        if os.path.getsize(path) > EXPORT_FILE_MAX_BYTES:
+            await message.answer("Файл больше 50 МБ. Попробуйте сжатие (gz) или фильтр по статусу.")
+            return
+        await message.answer_document(
+            FSInputFile(path, filename=export_filename(kind, status_code, fmt, compress)),
+            caption=f"📤 Выгрузка: {count} записей.",
         )
-    await message.answer("\n\n".join(lines))
+    finally:
+        os.remove(path)
+
+
+# Log pages: "lg:<n|p>:<seq>:<query token>". Filters do not fit into callback
+# data, so they are kept in the state backend under a short token ("-" for none).
+LOG_PAGE_PREFIX = "lg"
+LOG_QUERY_TTL = 24 * 3600
+LOG_QUERIES = state.namespace("log_queries", ttl=LOG_QUERY_TTL)
+LOGS_USAGE = (
+    "Формат: /logs [mod=ID] [target=ID|@user] [old=статус] [new=статус] "
+    "[since=ГГГГ-ММ-ДД|7d] [until=ГГГГ-ММ-ДД]"
+)
+
+
+def format_log_entry(entry: Dict[str, object]) -> str:
+    return (
+        "📒 Log:\n"
+        f"• Модератор: {entry.get('moderator_id')}\n"
+        f"• Кому: {entry.get('target_id')}\n"
+        f"• Старый статус → Новый статус: {entry.get('old_status')} → {entry.get('new_status')}\n"
+        f"• Пруф: {entry.get('proof') or '—'}\n"
+        f"• Комментарий: {entry.get('comment') or '—'}\n"
+        f"• Время: {entry.get('time', '—')}"
+    )
+
+
+def _parse_day(value: str) -> Optional[str]:
+    if value.endswith("d") and value[:-1].isdigit():
+        return (datetime.utcnow() - timedelta(days=int(value[:-1]))).isoformat()
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        return None
+
+
+async def resolve_target_id(value: str) -> Optional[int]:
+    parsed = parse_search_query(value) or value
+    if parsed.isdigit():
+        return int(parsed)
+    _, user = await resolve_user(parsed)
+    return int(user["id"]) if user else None
+
+
+async def parse_log_filters(args: str) -> Tuple[Dict[str, object], Optional[str]]:
+    filters: Dict[str, object] = {}
+    for part in args.split():
+        key, _, value = part.partition("=")
+        if not value:
+            return {}, LOGS_USAGE
+        if key == "mod" and value.isdigit():
+            filters["moderator_id"] = int(value)
+        elif key == "target":
+            target_id = await resolve_target_id(value)
+            if target_id is None:
+                return {}, "Пользователь не найден."
+            filters["target_id"] = target_id
+        elif key in {"old", "new"}:
+            filters[f"{key}_status"] = value
+        elif key in {"since", "until"} and _parse_day(value):
+            filters[key] = _parse_day(value)
+        else:
+            return {}, LOGS_USAGE
+    return filters, None
+
+
+async def render_log_page(token: str, cursor: Optional[int] = None, newer: bool = False) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+    filters = await LOG_QUERIES.aget(token) if token != "-" else {}
+    if filters is None:
+        return "Запрос устарел, повторите /logs.", None
+    entries, has_newer, has_older = await query_logs(filters, cursor, newer)
+    if not entries:
+        return ("Логи пусты." if not filters and cursor is None else "Записей не найдено."), None
+    buttons = []
+    if has_newer:
+        buttons.append(InlineKeyboardButton(text="⬅️ Новее", callback_data=f"{LOG_PAGE_PREFIX}:p:{entries[0]['seq']}:{token}"))
+    if has_older:
+        buttons.append(InlineKeyboardButton(text="Старее ➡️", callback_data=f"{LOG_PAGE_PREFIX}:n:{entries[-1]['seq']}:{token}"))
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
+    return "\n\n".join(format_log_entry(entry) for entry in entries), keyboard
+
+
+@router.message(Command("logs"))
+async def handle_logs(message: Message, command: CommandObject) -> None:
+    if not is_admin(message.from_user.id):
+        await message.answer("Недостаточно прав.")
+        return
+    filters, error = await parse_log_filters(command.args or "")
+    if error:
+        await message.answer(error)
+        return
+    token = "-"
+    if filters:
+        token = secrets.token_urlsafe(6)
+        await LOG_QUERIES.aset(token, filters)
+    text, keyboard = await render_log_page(token)
+    await message.answer(text, reply_markup=keyboard)
 
 
 @router.callback_query(F.data == "admin_logs")
 async def handle_admin_logs(call: CallbackQuery) -> None:
-    subscribed, _ = await ensure_subscription(call.bot, call.from_user)
-    if not subscribed:
-        await call.message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_admin(call.from_user.id):
         await call.message.answer("Недостаточно прав.")
         return
-    from bot.utils.db import get_log_entries
+    text, keyboard = await render_log_page("-")
+    await call.message.answer(text, reply_markup=keyboard)
+
+
+@router.callback_query(F.data.startswith(f"{LOG_PAGE_PREFIX}:"))
+async def handle_log_page(call: CallbackQuery) -> None:
+    if not is_admin(call.from_user.id):
+        await call.answer("Недостаточно прав.")
+        return
+    _, direction, seq, token = call.data.split(":", 3)
+    text, keyboard = await render_log_page(token, int(seq), newer=direction == "p")
+    await call.message.edit_text(text, reply_markup=keyboard)
+    await call.answer()
 
-    entries = get_log_entries()
+
+# History pages: "hs:<o|n|p>:<seq>:<target id>", "o" opens the first page
+# from a status card. Served by the per-target index of the journal.
+HISTORY_PREFIX = "hs"
+HISTORY_USAGE = "Используйте /history @user или /history id123456789."
+
+
+def history_keyboard(target_id: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[[InlineKeyboardButton(text="📜 История", callback_data=f"{HISTORY_PREFIX}:o:-:{target_id}")]]
+    )
+
+
+def format_history_entry(entry: Dict[str, object]) -> str:
+    lines = [
+        f"🕒 {str(entry.get('time', '—'))[:16].replace('T', ' ')}",
+        f"{entry.get('old_status')} → {entry.get('new_status')}",
+        f"Модератор: {entry.get('moderator_id')}",
+        f"Пруф: {entry.get('proof') or '—'}",
+    ]
+    if entry.get("comment"):
+        lines.append(f"Комментарий: {entry['comment']}")
+    return "\n".join(lines)
+
+
+async def render_history_page(target_id: int, cursor: Optional[int] = None, newer: bool = False) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+    entries, has_newer, has_older = await query_logs({"target_id": target_id}, cursor, newer)
     if not entries:
-        await call.message.answer("Логи пусты.")
-        return
-    last_entries = entries[-10:]
-    lines = []
-    for entry in last_entries:
-        lines.append(
-            "📒 Log:\n"
-            f"• Модератор: {entry['moderator_id']}\n"
-            f"• Кому: {entry['target_id']}\n"
-            f"• Старый статус → Новый статус: {entry['old_status']} → {entry['new_status']}\n"
-            f"• Пруф: {entry.get('proof', '—')}\n"
-            f"• Комментарий: {entry.get('comment', '—')}\n"
-            f"• Время: {entry['time']}"
-        )
-    await call.message.answer("\n\n".join(lines))
+        return f"История для {target_id} пуста.", None
+    buttons = []
+    if has_newer:
+        buttons.append(InlineKeyboardButton(text="⬅️ Новее", callback_data=f"{HISTORY_PREFIX}:p:{entries[0]['seq']}:{target_id}"))
+    if has_older:
+        buttons.append(InlineKeyboardButton(text="Старее ➡️", callback_data=f"{HISTORY_PREFIX}:n:{entries[-1]['seq']}:{target_id}"))
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
+    body = "\n\n".join(format_history_entry(entry) for entry in entries)
+    return f"📜 История статусов {target_id}:\n\n{body}", keyboard
+
+
+@router.message(Command("history"))
+async def handle_history(message: Message, command: CommandObject) -> None:
+    if not is_moderator(message.from_user.id):
+        await message.answer("Недостаточно прав.")
+        return
+    target_id = None
+    if message.reply_to_message and message.reply_to_message.from_user:
+        target_id = message.reply_to_message.from_user.id
+    elif command.args:
+        target_id = await resolve_target_id(command.args.strip())
+        if target_id is None:
+            await message.answer("Пользователь не найден.")
+            return
+    if target_id is None:
+        await message.answer(HISTORY_USAGE)
+        return
+    text, keyboard = await render_history_page(target_id)
+    await message.answer(text, reply_markup=keyboard)
+
+
+@router.callback_query(F.data.startswith(f"{HISTORY_PREFIX}:"))
+async def handle_history_page(call: CallbackQuery) -> None:
+    if not is_moderator(call.from_user.id):
+        await call.answer("Недостаточно прав.")
+        return
+    _, direction, seq, target_id = call.data.split(":", 3)
+    if direction == "o":
+        text, keyboard = await render_history_page(int(target_id))
+        await call.message.answer(text, reply_markup=keyboard)
+    else:
+        text, keyboard = await render_history_page(int(target_id), int(seq), newer=direction == "p")
+        await call.message.edit_text(text, reply_markup=keyboard)
+    await call.answer()
 
 
 @router.callback_query(F.data == "admin_refresh")
 async def handle_admin_refresh(call: CallbackQuery) -> None:
-    subscribed, _ = await ensure_subscription(call.bot, call.from_user)
-    if not subscribed:
-        await call.message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     if not is_admin(call.from_user.id):
         await call.message.answer("Недостаточно прав.")
         return
-    await call.message.answer(build_admin_panel_text(), reply_markup=admin_panel_keyboard())
+    await call.message.answer(await build_admin_panel_text(), reply_markup=admin_panel_keyboard())
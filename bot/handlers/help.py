@@ -2,9 +2,7 @@ from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.types import CallbackQuery, Message
 
-from bot.keyboards.subscription import subscription_keyboard
-from bot.utils.checks import ensure_subscription
-from bot.utils.db import get_statuses
+from bot.utils.status import statuses_snapshot
 
 router = Router()
 
@@ -30,37 +28,16 @@ HELP_TEXT = (
 
 @router.message(Command("help"))
 async def handle_help(message: Message) -> None:
-    subscribed, _ = await ensure_subscription(message.bot, message.from_user)
-    if not subscribed:
-        await message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     await message.answer(HELP_TEXT)
 
 
 @router.message(Command("info"))
 async def handle_info(message: Message) -> None:
-    subscribed, _ = await ensure_subscription(message.bot, message.from_user)
-    if not subscribed:
-        await message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
-    statuses = get_statuses()
+    statuses = statuses_snapshot()
     lines = [f"{data.get('title', code)} — {data.get('description', '')}" for code, data in statuses.items()]
     await message.answer("Доступные статусы:\n" + "\n".join(lines))
 
 
 @router.callback_query(F.data == "menu_help")
 async def handle_menu_help(call: CallbackQuery) -> None:
-    subscribed, _ = await ensure_subscription(call.bot, call.from_user)
-    if not subscribed:
-        await call.message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     await call.message.answer(HELP_TEXT)
@@ -1,23 +1,65 @@
+import base64
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
 
 from bot.keyboards.lists_menu import lists_keyboard
-from bot.keyboards.subscription import subscription_keyboard
-from bot.utils.checks import ensure_subscription
-from bot.utils.db import get_statuses, list_users_by_status
-from bot.utils.status import status_photo, status_title
+from bot.utils.async_db import count_users_by_status, page_users_by_status
+from bot.utils.media import answer_photo
+from bot.utils.status import status_photo, status_title, statuses_snapshot
 
 router = Router()
 
+# Page buttons carry the (updated_at, id) of the edge entry as the cursor:
+# "lp:<n|p>:<updated_at token>:<id>:<status code>". The token is "t" and the
+# hex microseconds since the epoch when that reproduces updated_at exactly,
+# otherwise "b" and the unpadded urlsafe base64 of the string itself.
+PAGE_PREFIX = "lp"
+_EPOCH = datetime(1970, 1, 1)
+
 
 def lists_text() -> str:
-    titles = [status.get("title", code) for code, status in get_statuses().items()]
+    titles = [status.get("title", code) for code, status in statuses_snapshot().items()]
     body = "\n".join(titles)
     return f"📋 Выберите список:\n{body}" if body else "Нет доступных списков"
 
 
-def format_list(status_code: str) -> str:
-    users = list_users_by_status(status_code)
+def _encode_stamp(updated_at: str) -> str:
+    try:
+        micros = (datetime.fromisoformat(updated_at) - _EPOCH) // timedelta(microseconds=1)
+    except (TypeError, ValueError):
+        micros = -1
+    if micros >= 0:
+        token = f"t{micros:x}"
+        if _decode_stamp(token) == updated_at:
+            return token
+    return "b" + base64.urlsafe_b64encode(updated_at.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_stamp(token: str) -> str:
+    kind, payload = token[:1], token[1:]
+    if kind == "t":
+        return (_EPOCH + timedelta(microseconds=int(payload, 16))).isoformat()
+    if kind == "b":
+        return base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)).decode("utf-8")
+    raise ValueError(f"unknown cursor token {token!r}")
+
+
+def _encode_cursor(user: Dict[str, object]) -> str:
+    return f"{_encode_stamp(str(user.get('updated_at') or ''))}:{user.get('id')}"
+
+
+def _decode_cursor(token: str, user_id: str) -> Optional[Tuple[str, int]]:
+    # Buttons from before the current format start over from the first page.
+    try:
+        return (_decode_stamp(token), int(user_id))
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def format_list_page(status_code: str, users: List[Dict[str, object]], total: int) -> str:
     title = status_title(status_code)
     if not users:
         return f"{title}:\nЗаписей нет."
@@ -27,48 +69,58 @@ def format_list(status_code: str) -> str:
             for user in users
         ]
     )
-    return f"{title}:\n{lines}"
+    return f"{title} ({total}):\n{lines}"
+
+
+def list_page_keyboard(status_code: str, users: List[Dict[str, object]], has_newer: bool, has_older: bool) -> Optional[InlineKeyboardMarkup]:
+    buttons = []
+    if has_newer and users:
+        buttons.append(("⬅️ Назад", f"{PAGE_PREFIX}:p:{_encode_cursor(users[0])}:{status_code}"))
+    if has_older and users:
+        buttons.append(("Далее ➡️", f"{PAGE_PREFIX}:n:{_encode_cursor(users[-1])}:{status_code}"))
+    # Telegram caps callback data at 64 bytes; very long status codes get no paging.
+    row = [InlineKeyboardButton(text=text, callback_data=data) for text, data in buttons if len(data.encode()) <= 64]
+    return InlineKeyboardMarkup(inline_keyboard=[row]) if row else None
+
+
+async def render_list_page(status_code: str, cursor: Optional[Tuple[str, int]] = None, newer: bool = False) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+    users, has_newer, has_older = await page_users_by_status(status_code, cursor, newer)
+    total = await count_users_by_status(status_code)
+    return format_list_page(status_code, users, total), list_page_keyboard(status_code, users, has_newer, has_older)
 
 
 @router.callback_query(F.data == "menu_lists")
 async def handle_lists_menu(call: CallbackQuery) -> None:
-    subscribed, _ = await ensure_subscription(call.bot, call.from_user)
-    if not subscribed:
-        await call.message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     await call.message.answer(lists_text(), reply_markup=lists_keyboard())
 
 
 @router.callback_query(F.data.startswith("list_"))
 async def handle_list_item(call: CallbackQuery) -> None:
-    subscribed, _ = await ensure_subscription(call.bot, call.from_user)
-    if not subscribed:
-        await call.message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     code = call.data.replace("list_", "")
-    statuses = get_statuses()
+    statuses = statuses_snapshot()
     if code not in statuses:
         await call.message.answer("Категория не найдена.")
         return
-    await call.message.answer_photo(
-        photo=status_photo(code),
-        caption=format_list(code),
+    caption, keyboard = await render_list_page(code)
+    await answer_photo(
+        call.message,
+        status_photo(code),
+        caption=caption,
+        reply_markup=keyboard,
     )
 
 
+@router.callback_query(F.data.startswith(f"{PAGE_PREFIX}:"))
+async def handle_list_page(call: CallbackQuery) -> None:
+    _, direction, token, user_id, code = call.data.split(":", 4)
+    if code not in statuses_snapshot():
+        await call.answer("Категория не найдена.")
+        return
+    caption, keyboard = await render_list_page(code, _decode_cursor(token, user_id), newer=direction == "p")
+    await call.message.edit_caption(caption=caption, reply_markup=keyboard)
+    await call.answer()
+
+
 @router.message(F.text == "Списки")
 async def handle_lists_text(message: Message) -> None:
-    subscribed, _ = await ensure_subscription(message.bot, message.from_user)
-    if not subscribed:
-        await message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     await message.answer(lists_text(), reply_markup=lists_keyboard())
@@ -1,27 +1,52 @@
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
 from aiogram import Router, F
+from aiogram.dispatcher.event.bases import SkipHandler
 from aiogram.filters import Command, CommandObject
 from aiogram.types import CallbackQuery, InlineQuery, InlineQueryResultArticle, InputTextMessageContent, Message
 
-from bot.keyboards.subscription import subscription_keyboard
-from bot.utils.checks import ensure_subscription, parse_search_query
-from bot.utils.db import resolve_user
-from bot.utils.status import format_status_text, status_photo
-from bot.handlers.admin import has_pending_action
+from bot.middlewares.subscription import require_subscription
+from bot.utils.checks import parse_search_query
+from bot.utils.async_db import resolve_user, search_users_by_prefix
+from bot.utils.db import PREFIX_SEARCH_LIMIT
+from bot.utils.media import answer_photo
+from bot.utils.status import format_status_text, status_photo, status_title
+from bot.handlers.admin import has_pending_action, history_keyboard, is_moderator
 
 router = Router()
 
+USERNAME_PREFIX_RE = re.compile(r"[A-Za-z0-9_]{1,32}")
+
+# Inline answers must stay fast: prefix lookups that take longer than the
+# budget are answered with no results instead of stalling the client.
+INLINE_LOOKUP_BUDGET = float(os.environ.get("INLINE_LOOKUP_BUDGET", "0.5"))
+INLINE_CACHE_TIME = int(os.environ.get("INLINE_CACHE_TIME", "5"))
+PREFIX_CACHE_TTL = 10.0
+PREFIX_CACHE_SIZE = 1024
+
+# Recent prefix -> (stored at, matches). Inline queries arrive once per
+# keystroke, so a query that extends a cached prefix whose result was not cut
+# by the limit is answered by filtering that result instead of a new lookup.
+_PREFIX_CACHE: "OrderedDict[str, Tuple[float, List[Dict[str, object]]]]" = OrderedDict()
+
 
 async def respond_with_status(message: Message, query: str) -> None:
-    subscribed, _ = await ensure_subscription(message.bot, message.from_user)
-    if not subscribed:
-        await message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
-    normalized, user = resolve_user(query)
+    normalized, user = await resolve_user(query)
     caption = format_status_text(user, normalized)
-    await message.answer_photo(photo=status_photo(user.get("status", "unknown") if user else "unknown"), caption=caption)
+    keyboard = None
+    if user and message.from_user and is_moderator(message.from_user.id):
+        keyboard = history_keyboard(int(user["id"]))
+    await answer_photo(
+        message,
+        status_photo(user.get("status", "unknown") if user else "unknown"),
+        caption=caption,
+        reply_markup=keyboard,
+    )
 
 
 @router.message(Command("search"))
@@ -33,51 +58,87 @@ async def handle_search(message: Message, command: CommandObject) -> None:
         await message.answer("Укажите ID или username для поиска: /search id123 или /search @name")
 
 
-# Non-blocking free-text handler so command messages continue to other routers
-@router.message(F.text, flags={"block": False})
+# Non-blocking free-text handler: anything that is not a search query is passed
+# on so commands and pending admin dialogs reach the routers after this one.
+# Only actual queries are gated, so group chatter never triggers the prompt.
+@router.message(F.text, flags={"skip_subscription": True})
 async def handle_free_text(message: Message) -> None:
-    if message.from_user and has_pending_action(message.from_user.id):
-        return
+    if message.from_user and await has_pending_action(message.from_user.id):
+        raise SkipHandler()
     if message.text and message.text.startswith("/"):
-        return
+        raise SkipHandler()
     query = parse_search_query(message.text or "")
     if not query:
+        raise SkipHandler()
+    if not await require_subscription(message, message.from_user):
         return
     await respond_with_status(message, query)
 
 
 @router.callback_query(F.data == "menu_search")
 async def handle_menu_search(call: CallbackQuery) -> None:
-    subscribed, _ = await ensure_subscription(call.bot, call.from_user)
-    if not subscribed:
-        await call.message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     await call.message.answer("Отправьте @username или id123456 для проверки статуса.")
 
 
-@router.inline_query()
+def _cached_prefix(handle: str, now: float) -> Optional[List[Dict[str, object]]]:
+    cached = _PREFIX_CACHE.get(handle)
+    if cached and now - cached[0] < PREFIX_CACHE_TTL:
+        _PREFIX_CACHE.move_to_end(handle)
+        return cached[1]
+    for cut in range(len(handle) - 1, 0, -1):
+        shorter = _PREFIX_CACHE.get(handle[:cut])
+        if shorter and now - shorter[0] < PREFIX_CACHE_TTL and len(shorter[1]) < PREFIX_SEARCH_LIMIT:
+            return [user for user in shorter[1] if str(user.get("username") or "").casefold().startswith(handle)]
+    return None
+
+
+async def prefix_matches(prefix: str) -> List[Dict[str, object]]:
+    handle = prefix.casefold()
+    now = time.monotonic()
+    matches = _cached_prefix(handle, now)
+    if matches is None:
+        try:
+            matches = await asyncio.wait_for(search_users_by_prefix(handle), INLINE_LOOKUP_BUDGET)
+        except asyncio.TimeoutError:
+            return []
+    _PREFIX_CACHE[handle] = (now, matches)
+    _PREFIX_CACHE.move_to_end(handle)
+    while len(_PREFIX_CACHE) > PREFIX_CACHE_SIZE:
+        _PREFIX_CACHE.popitem(last=False)
+    return matches
+
+
+def inline_result(user: Optional[Dict[str, object]], query: str) -> InlineQueryResultArticle:
+    status_code = user.get("status", "unknown") if user else "unknown"
+    text = format_status_text(user, query)
+    username = user.get("username") if user else None
+    return InlineQueryResultArticle(
+        id=f"user_{user.get('id')}" if user else f"query_{query}"[:64],
+        title=f"@{username}" if username else query,
+        description=f"{status_title(status_code)} | id {user.get('id')}" if user else status_title(status_code),
+        input_message_content=InputTextMessageContent(message_text=text),
+        thumbnail_url=status_photo(status_code),
+    )
+
+
+@router.inline_query(flags={"skip_subscription": True})
 async def handle_inline_query(inline_query: InlineQuery) -> None:
     query_text = inline_query.query.strip()
     if not query_text:
         await inline_query.answer([], cache_time=1)
         return
     parsed = parse_search_query(query_text)
-    if not parsed:
-        await inline_query.answer([], cache_time=1)
-        return
-    normalized, user = resolve_user(parsed)
-    text = format_status_text(user, normalized)
-    result = InlineQueryResultArticle(
-        id="status",
-        title="Результат поиска",
-        description=text.replace("\n", " ")[:100],
-        input_message_content=InputTextMessageContent(message_text=text),
-        thumb_url=status_photo(user.get("status", "unknown") if user else "unknown"),
-    )
-    await inline_query.answer([result], cache_time=1, is_personal=True)
+    if parsed and parsed.isdigit():
+        normalized, user = await resolve_user(parsed)
+        results = [inline_result(user, normalized)]
+    else:
+        prefix = query_text.lstrip("@")
+        if not USERNAME_PREFIX_RE.fullmatch(prefix):
+            await inline_query.answer([], cache_time=1)
+            return
+        users = await prefix_matches(prefix)
+        results = [inline_result(user, prefix) for user in users] or [inline_result(None, prefix)]
+    await inline_query.answer(results, cache_time=INLINE_CACHE_TIME)
 
 
 @router.message(Command("check"))
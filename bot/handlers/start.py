@@ -6,6 +6,7 @@ from bot.handlers.admin import is_admin
 from bot.keyboards.main_menu import main_menu_keyboard
 from bot.keyboards.subscription import subscription_keyboard
 from bot.utils.checks import ensure_subscription
+from bot.utils.media import answer_photo
 from bot.utils.status import FOOTER
 
 PHOTO_START = "https://i.imgur.com/4N0JrFj.png"
@@ -15,13 +16,6 @@ router = Router()
 
 @router.message(CommandStart())
 async def handle_start(message: Message) -> None:
-    subscribed, missing = await ensure_subscription(message.bot, message.from_user)
-    if not subscribed:
-        await message.answer(
-            "Для работы бота необходима подписка на каналы.",
-            reply_markup=subscription_keyboard(),
-        )
-        return
     description = (
         "🤖 ZhorikBase — анти-скам база по пользователям.\n"
         "• Проверяйте статусы участников\n"
@@ -29,16 +23,17 @@ async def handle_start(message: Message) -> None:
         "• Логируйте каждое изменение\n\n"
         f"{FOOTER}"
     )
-    await message.answer_photo(
-        photo=PHOTO_START,
+    await answer_photo(
+        message,
+        PHOTO_START,
         caption=description,
         reply_markup=main_menu_keyboard(show_admin=is_admin(message.from_user.id)),
     )
 
 
-@router.callback_query(lambda c: c.data == "check_subs")
+@router.callback_query(lambda c: c.data == "check_subs", flags={"skip_subscription": True})
 async def handle_check_subs(call: CallbackQuery) -> None:
-    subscribed, missing = await ensure_subscription(call.bot, call.from_user)
+    subscribed, missing = await ensure_subscription(call.bot, call.from_user, force=True)
     if subscribed:
         await call.message.answer(
             "Спасибо! Подписка подтверждена.",
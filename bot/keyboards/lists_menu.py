@@ -1,9 +1,9 @@
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-from bot.utils.db import get_statuses
+from bot.utils.status import statuses_snapshot
 
 
 def lists_keyboard() -> InlineKeyboardMarkup:
-    statuses = get_statuses()
+    statuses = statuses_snapshot()
     rows = []
     for code, status in statuses.items():
         rows.append([InlineKeyboardButton(text=status.get("title", code), callback_data=f"list_{code}")])
@@ -4,27 +4,66 @@ import os
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
 
 from bot.handlers import admin, help, lists, profile, search, start
-from bot.utils.db import ensure_database
+from bot.middlewares.metrics import ApiMetricsMiddleware, HandlerMetricsMiddleware, UpdateMetricsMiddleware
+from bot.middlewares.shared import SharedSnapshotMiddleware
+from bot.middlewares.subscription import SubscriptionMiddleware
+from bot.utils import metrics, notifications
+from bot.utils.async_db import flush_db
+from bot.utils.outbound import TELEGRAM_POOL_SIZE, OutboundLimiter
+from bot.utils.db import DB_SHARED, ensure_database
 
+# polling (default) or webhook, see bot/webhook.py for its settings.
+BOT_MODE = os.environ.get("BOT_MODE", "polling").lower()
 
-async def main() -> None:
-    logging.basicConfig(level=logging.INFO)
-    ensure_database()
-    token = os.environ.get("BOT_TOKEN")
-    if not token:
-        raise RuntimeError("BOT_TOKEN is not set")
-    bot = Bot(token=token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+
+def build_dispatcher() -> Dispatcher:
     dp = Dispatcher()
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    if DB_SHARED:
+        dp.update.outer_middleware(SharedSnapshotMiddleware())
+    handler_metrics = HandlerMetricsMiddleware()
+    subscription_gate = SubscriptionMiddleware()
+    for observer in (dp.message, dp.callback_query, dp.inline_query):
+        observer.middleware(handler_metrics)
+        observer.middleware(subscription_gate)
     dp.include_router(start.router)
     dp.include_router(help.router)
     dp.include_router(profile.router)
     dp.include_router(lists.router)
     dp.include_router(search.router)
     dp.include_router(admin.router)
-    await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+    dp.shutdown.register(notifications.drain)
+    return dp
+
+
+async def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    ensure_database()
+    token = os.environ.get("BOT_TOKEN")
+    if not token:
+        raise RuntimeError("BOT_TOKEN is not set")
+    session = AiohttpSession(limit=TELEGRAM_POOL_SIZE)
+    session.middleware(OutboundLimiter())
+    session.middleware(ApiMetricsMiddleware())
+    bot = Bot(token=token, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    dp = build_dispatcher()
+    metrics_runner = await metrics.serve() if metrics.METRICS_PORT else None
+    try:
+        if BOT_MODE == "webhook":
+            from bot.webhook import run_webhook
+
+            await run_webhook(bot, dp)
+        else:
+            await bot.delete_webhook()
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await flush_db()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.dispatcher.event.bases import CancelHandler, SkipHandler
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+from bot.utils import metrics
+
+
+def handler_name(data: Dict[str, Any]) -> str:
+    handler = data.get("handler")
+    callback = getattr(handler, "callback", None)
+    if callback is None:
+        return "unknown"
+    return f"{callback.__module__.rsplit('.', 1)[-1]}.{getattr(callback, '__name__', type(callback).__name__)}"
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Outer middleware on dp.update: update counts, errors and total time by type."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        update_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        metrics.UPDATES.inc(update_type)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            metrics.UPDATE_ERRORS.inc(update_type)
+            raise
+        finally:
+            metrics.UPDATE_LATENCY.observe(time.perf_counter() - started, update_type)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Inner middleware: latency and errors per handler.
+
+    Registered before the other inner middlewares so their time is counted
+    too. Handlers that pass the event on (SkipHandler) are not recorded.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = handler_name(data)
+        started = time.perf_counter()
+        try:
+            result = await handler(event, data)
+        except (SkipHandler, CancelHandler):
+            raise
+        except Exception as error:
+            metrics.HANDLER_ERRORS.inc(name, type(error).__name__)
+            metrics.HANDLER_LATENCY.observe(time.perf_counter() - started, name)
+            raise
+        metrics.HANDLER_LATENCY.observe(time.perf_counter() - started, name)
+        return result
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Session middleware: Bot API call counts, errors and latency by method.
+
+    Registered after OutboundLimiter, so the time is the request itself and
+    every retry is counted as its own call.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        metrics.API_CALLS.inc(name)
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as error:
+            metrics.API_ERRORS.inc(name, type(error).__name__)
+            raise
+        finally:
+            metrics.API_LATENCY.observe(time.perf_counter() - started, name)
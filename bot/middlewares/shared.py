@@ -0,0 +1,24 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.utils.async_db import refresh_snapshots
+
+
+class SharedSnapshotMiddleware(BaseMiddleware):
+    """Outer middleware on dp.update for DB_SHARED deployments.
+
+    Picks up role and status changes made by other processes before each
+    update, on the storage executor, so the permission checks and renders
+    that read db.role_table() / db.status_catalogue() stay in memory.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        await refresh_snapshots()
+        return await handler(event, data)
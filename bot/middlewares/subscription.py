@@ -0,0 +1,41 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, Message, TelegramObject, User
+
+from bot.keyboards.subscription import subscription_keyboard
+from bot.utils.checks import ensure_subscription
+
+SUBSCRIPTION_REQUIRED_TEXT = "Для работы бота необходима подписка на каналы."
+
+
+async def require_subscription(event: TelegramObject, user: User) -> bool:
+    """Check the user's subscription and send the subscribe prompt when it is missing."""
+    subscribed, _ = await ensure_subscription(event.bot, user)
+    if subscribed:
+        return True
+    target = event.message if isinstance(event, CallbackQuery) else event
+    if isinstance(target, Message):
+        await target.answer(SUBSCRIPTION_REQUIRED_TEXT, reply_markup=subscription_keyboard())
+    return False
+
+
+class SubscriptionMiddleware(BaseMiddleware):
+    """Gate every handler behind the channel subscription check.
+
+    Handlers opt out with ``flags={"skip_subscription": True}``.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None or get_flag(data, "skip_subscription"):
+            return await handler(event, data)
+        if not await require_subscription(event, user):
+            return None
+        return await handler(event, data)
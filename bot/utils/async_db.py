@@ -0,0 +1,168 @@
+"""Awaitable wrappers around bot.utils.db for use from handlers.
+
+Storage calls do blocking file or SQLite I/O, so they run on executors
+instead of the event loop: reads on a small pool, writes on a single
+thread so they are applied one at a time and in submission order.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from . import bulk, db, export, log_index
+
+DB_READ_WORKERS = int(os.environ.get("DB_READ_WORKERS", "4"))
+
+_READ_EXECUTOR = ThreadPoolExecutor(max_workers=DB_READ_WORKERS, thread_name_prefix="db-read")
+_WRITE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+# Exports and import parsing run one at a time on their own thread so a long
+# one never ties up the pools that serve handler reads and writes.
+_BULK_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-bulk")
+
+T = TypeVar("T")
+
+
+async def _read(func: Callable[..., T], *args, **kwargs) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_READ_EXECUTOR, functools.partial(func, *args, **kwargs))
+
+
+async def _write(func: Callable[..., T], *args, **kwargs) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_WRITE_EXECUTOR, functools.partial(func, *args, **kwargs))
+
+
+async def get_user(identifier: str) -> Optional[Dict[str, object]]:
+    return await _read(db.get_user, identifier)
+
+
+async def resolve_user(query: str) -> Tuple[str, Optional[Dict[str, object]]]:
+    return await _read(db.resolve_user, query)
+
+
+async def search_users_by_prefix(prefix: str, limit: int = db.PREFIX_SEARCH_LIMIT) -> List[Dict[str, object]]:
+    return await _read(db.search_users_by_prefix, prefix, limit)
+
+
+async def get_statuses() -> Dict[str, Dict[str, str]]:
+    return await _read(db.get_statuses)
+
+
+async def list_users_by_status(status_code: str) -> List[Dict[str, object]]:
+    return await _read(db.list_users_by_status, status_code)
+
+
+async def page_users_by_status(
+    status_code: str,
+    cursor: Optional[db.UserOrderKey] = None,
+    newer: bool = False,
+    limit: int = db.LIST_PAGE_SIZE,
+) -> Tuple[List[Dict[str, object]], bool, bool]:
+    return await _read(db.page_users_by_status, status_code, cursor, newer, limit)
+
+
+async def count_users_by_status(status_code: str) -> int:
+    return await _read(db.count_users_by_status, status_code)
+
+
+async def stats_by_status() -> Dict[str, int]:
+    return await _read(db.stats_by_status)
+
+
+async def refresh_snapshots() -> None:
+    await _read(db.refresh_snapshots)
+
+
+async def get_admins() -> List[int]:
+    return await _read(db.get_admins)
+
+
+async def get_moderators() -> List[int]:
+    return await _read(db.get_moderators)
+
+
+async def write_export(kind: str, status_code: Optional[str] = None, fmt: str = "csv", compress: bool = False) -> Tuple[str, int]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_BULK_EXECUTOR, export.write_export, kind, status_code, fmt, compress)
+
+
+async def query_logs(
+    filters: Optional[log_index.LogFilter] = None,
+    cursor: Optional[int] = None,
+    newer: bool = False,
+    limit: int = log_index.LOG_PAGE_SIZE,
+) -> Tuple[List[Dict[str, object]], bool, bool]:
+    return await _read(db.query_logs, filters, cursor, newer, limit)
+
+
+async def get_log_entries(limit: Optional[int] = None) -> List[Dict[str, object]]:
+    return await _read(db.get_log_entries, limit)
+
+
+async def upsert_user(
+    user_id: int,
+    username: Optional[str],
+    status: str,
+    proof: Optional[str],
+    comment: Optional[str],
+    updated_by: int,
+) -> Dict[str, object]:
+    return await _write(db.upsert_user, user_id, username, status, proof, comment, updated_by)
+
+
+async def bulk_upsert_users(rows: List[Dict[str, object]], updated_by: int) -> List[Dict[str, object]]:
+    return await _write(db.bulk_upsert_users, rows, updated_by)
+
+
+async def append_log(entry: Dict[str, object]) -> None:
+    await _write(db.append_log, entry)
+
+
+async def append_logs(entries: List[Dict[str, object]]) -> None:
+    await _write(db.append_logs, entries)
+
+
+async def import_statuses(stream: BinaryIO, filename: str, actor_id: int) -> Dict[str, object]:
+    # Only the batch upsert and its log entries wait for the write thread.
+    loop = asyncio.get_running_loop()
+    parsed = await loop.run_in_executor(_BULK_EXECUTOR, bulk.parse_import, stream, filename)
+    return await _write(bulk.apply_import, parsed, actor_id)
+
+
+async def save_status(code: str, title: str, description: str, photo: str) -> None:
+    await _write(db.save_status, code, title, description, photo)
+
+
+async def update_status(code: str, title: Optional[str] = None, description: Optional[str] = None, photo: Optional[str] = None) -> bool:
+    return await _write(db.update_status, code, title, description, photo)
+
+
+async def delete_status(code: str) -> bool:
+    return await _write(db.delete_status, code)
+
+
+async def add_moderator(user_id: int) -> None:
+    await _write(db.add_moderator, user_id)
+
+
+async def remove_moderator(user_id: int) -> bool:
+    return await _write(db.remove_moderator, user_id)
+
+
+async def get_photo_file_id(photo: str) -> Optional[str]:
+    return await _read(db.get_photo_file_id, photo)
+
+
+async def save_photo_file_id(photo: str, file_id: str) -> None:
+    await _write(db.save_photo_file_id, photo, file_id)
+
+
+async def drop_photo_file_id(photo: str) -> None:
+    await _write(db.drop_photo_file_id, photo)
+
+
+async def flush_db() -> None:
+    """Wait for queued writes, then persist them."""
+    await _write(db.flush_db)
@@ -0,0 +1,239 @@
+import csv
+import io
+import json
+import os
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from . import db
+from .logs import build_log
+
+# Bulk status import: rows are parsed and validated one at a time from the
+# uploaded file, then applied together with a single persist and log append.
+BULK_IMPORT_MAX_ROWS = int(os.environ.get("BULK_IMPORT_MAX_ROWS", "50000"))
+BULK_IMPORT_COLUMNS = ("id", "username", "status", "proof", "comment")
+
+_READ_CHUNK = 64 * 1024
+# Longest single JSON array item; anything longer is treated as malformed.
+BULK_IMPORT_MAX_ITEM_CHARS = 1024 * 1024
+
+# (line or item number, raw row or None) pairs; None means the row did not parse.
+Row = Tuple[int, Optional[Dict[str, object]]]
+
+
+def _csv_rows(text: io.TextIOBase) -> Iterator[Row]:
+    reader = csv.DictReader(text)
+    for row in reader:
+        yield reader.line_num, {(key or "").strip().lower(): value for key, value in row.items()}
+
+
+def _jsonl_rows(text: io.TextIOBase) -> Iterator[Row]:
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+class MalformedFile(ValueError):
+    """The file cannot be split into rows past item ``number``; none of it is applied."""
+
+    def __init__(self, number: int, reason: str) -> None:
+        super().__init__(reason)
+        self.number = number
+        self.reason = reason
+
+
+def _incomplete(error: json.JSONDecodeError, buffer: str) -> bool:
+    # The item may just continue in the next chunk: the error is in the last
+    # few characters (a cut literal, number or \u escape) or inside a string
+    # that has not been closed yet.
+    return error.pos >= len(buffer) - 16 or error.msg.startswith("Unterminated string")
+
+
+def _json_array_rows(text: io.TextIOBase) -> Iterator[Row]:
+    # Decodes one array item at a time instead of loading the whole document.
+    # A syntax error leaves no reliable place to resume from, so it raises
+    # MalformedFile rather than guessing where the next item starts.
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    number = 0
+    started = eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != "[":
+                    raise MalformedFile(1, "ожидался JSON-массив")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                rest = buffer[position + 1:]
+                while True:
+                    if rest.strip():
+                        raise MalformedFile(number + 1, "лишние данные после JSON-массива")
+                    rest = text.read(_READ_CHUNK)
+                    if not rest:
+                        return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as error:
+                if eof or not _incomplete(error, buffer) or len(buffer) - position > BULK_IMPORT_MAX_ITEM_CHARS:
+                    raise MalformedFile(number + 1, f"некорректный JSON: {error.msg}") from None
+            else:
+                # A number at the end of the buffer may still have digits to come.
+                if end < len(buffer) or eof:
+                    number += 1
+                    yield number, item if isinstance(item, dict) else None
+                    position = end
+                    continue
+        elif eof:
+            if not started:
+                raise MalformedFile(1, "ожидался JSON-массив")
+            raise MalformedFile(number + 1, "массив не закрыт")
+        chunk = text.read(_READ_CHUNK)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def iter_rows(stream: BinaryIO, filename: str) -> Iterator[Row]:
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    name = filename.lower()
+    if name.endswith(".jsonl") or name.endswith(".ndjson"):
+        return _jsonl_rows(text)
+    if name.endswith(".json"):
+        return _json_array_rows(text)
+    return _csv_rows(text)
+
+
+def _clean(value: object) -> str:
+    return str(value).strip() if value is not None else ""
+
+
+def validate_row(
+    row: Dict[str, object],
+    statuses: Dict[str, object],
+    batch_usernames: Dict[str, int],
+) -> Tuple[Optional[Dict[str, object]], Optional[str]]:
+    raw_id = _clean(row.get("id", row.get("user_id")))
+    username = _clean(row.get("username")).lstrip("@") or None
+    status = _clean(row.get("status"))
+    if not status:
+        return None, "не указан статус"
+    if status not in statuses:
+        return None, f"неизвестный статус {status}"
+    if raw_id.lower().startswith("id"):
+        raw_id = raw_id[2:]
+    if raw_id:
+        if not raw_id.isdigit():
+            return None, f"некорректный ID {raw_id}"
+        user_id = int(raw_id)
+    elif username:
+        existing = db.get_user(username)
+        if existing:
+            user_id = int(existing["id"])
+        elif username.lower() in batch_usernames:
+            user_id = batch_usernames[username.lower()]
+        else:
+            return None, f"пользователь @{username} не найден, укажите ID"
+    else:
+        return None, "не указан ID или username"
+    return {
+        "id": user_id,
+        "username": username,
+        "status": status,
+        "proof": _clean(row.get("proof")),
+        "comment": _clean(row.get("comment")),
+    }, None
+
+
+def parse_import(stream: BinaryIO, filename: str) -> Dict[str, object]:
+    """Read and validate every row of an uploaded file without writing anything.
+
+    Returns {"accepted", "rejected": [(line, reason)], "truncated", "error"};
+    "error" is set when the file could not be read at all.
+    """
+    statuses = dict(db.status_catalogue()[1])
+    accepted: List[Dict[str, object]] = []
+    rejected: List[Tuple[int, str]] = []
+    batch_usernames: Dict[str, int] = {}
+    truncated = False
+    failure: Optional[str] = None
+    try:
+        for number, row in iter_rows(stream, filename):
+            if len(accepted) + len(rejected) >= BULK_IMPORT_MAX_ROWS:
+                truncated = True
+                break
+            if row is None:
+                rejected.append((number, "не удалось разобрать строку"))
+                continue
+            valid, reason = validate_row(row, statuses, batch_usernames)
+            if valid is None:
+                rejected.append((number, reason))
+                continue
+            valid["line"] = number
+            if valid["username"]:
+                batch_usernames[str(valid["username"]).lower()] = int(valid["id"])
+            accepted.append(valid)
+    except MalformedFile as error:
+        # Applying the rows before the error would import half a file.
+        accepted.clear()
+        rejected = [(error.number, error.reason)]
+        truncated = True
+        failure = error.reason
+    except (UnicodeDecodeError, csv.Error) as error:
+        accepted.clear()
+        failure = f"не удалось прочитать файл: {error}"
+        rejected = [(0, failure)]
+        truncated = True
+    return {"accepted": accepted, "rejected": rejected, "truncated": truncated, "error": failure}
+
+
+def apply_import(parsed: Dict[str, object], actor_id: int) -> Dict[str, object]:
+    """Apply the rows accepted by parse_import() as one batch and log them.
+
+    Returns {"applied", "changes", "rejected": [(line, reason)], "truncated", "error"}.
+    """
+    # A status may have been deleted since the file was validated.
+    statuses = db.status_catalogue()[1]
+    rejected = list(parsed["rejected"])
+    accepted = []
+    for row in parsed["accepted"]:
+        if row["status"] in statuses:
+            accepted.append(row)
+        else:
+            rejected.append((int(row["line"]), f"неизвестный статус {row['status']}"))
+    results = db.bulk_upsert_users(accepted, actor_id) if accepted else []
+    db.append_logs([
+        build_log(
+            moderator_id=actor_id,
+            target_id=int(result["user"]["id"]),
+            old_status=str(result["old_status"]),
+            new_status=str(result["user"]["status"]),
+            proof=str(result["user"]["proof"]),
+            comment=str(result["user"]["comment"]),
+        )
+        for result in results
+    ])
+    changes: Dict[str, int] = {}
+    for result in results:
+        transition = f"{result['old_status']} → {result['user']['status']}"
+        changes[transition] = changes.get(transition, 0) + 1
+    return {
+        "applied": len(results),
+        "changes": changes,
+        "rejected": sorted(rejected),
+        "truncated": parsed["truncated"],
+        "error": parsed["error"],
+    }
+
+
+def import_statuses(stream: BinaryIO, filename: str, actor_id: int) -> Dict[str, object]:
+    """Validate every row of an uploaded file and apply the valid ones as one batch."""
+    return apply_import(parse_import(stream, filename), actor_id)
@@ -1,11 +1,32 @@
-from typing import List, Optional, Tuple
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
 
 from aiogram import Bot
-from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError
+from aiogram.exceptions import TelegramAPIError
 from aiogram.types import User
 
+from . import metrics, state
+
+logger = logging.getLogger(__name__)
+
 SUB_CHANNELS = ["@ZhorikBase", "@ZhorikBaseProofs"]
 
+# Seconds a get_chat_member answer is reused. Negative answers expire sooner
+# so users who just subscribed are let in quickly even without "Проверить".
+SUB_CACHE_TTL = float(os.environ.get("SUB_CACHE_TTL", "300"))
+SUB_CACHE_NEGATIVE_TTL = float(os.environ.get("SUB_CACHE_NEGATIVE_TTL", "30"))
+
+# "<user id>:<channel>" -> subscribed, in the shared state backend.
+_SUB_CACHE = state.namespace("subscription")
+
+# Checks currently running per user; concurrent callers await the same one.
+_IN_FLIGHT: Dict[int, "asyncio.Task[Tuple[bool, List[str]]]"] = {}
+
+SUBSCRIPTION_STATS: Dict[str, int] = {"checks": 0, "coalesced": 0, "cache_hits": 0, "api_calls": 0, "api_errors": 0}
+metrics.expose_stats("bot_subscription", "Subscription check counters.", SUBSCRIPTION_STATS)
+
 
 def parse_search_query(text: str) -> Optional[str]:
     cleaned = text.strip()
@@ -20,17 +41,60 @@ def parse_search_query(text: str) -> Optional[str]:
     return None
 
 
-async def ensure_subscription(bot: Bot, user: User) -> Tuple[bool, List[str]]:
-    missing: List[str] = []
-    for channel in SUB_CHANNELS:
-        try:
-            member = await bot.get_chat_member(chat_id=channel, user_id=user.id)
-            if member.status in {"left", "kicked"}:
-                missing.append(channel)
-        except (TelegramForbiddenError, TelegramAPIError):
-            # Treat any access or API issues as a missing subscription to avoid silent failures
-            missing.append(channel)
-        except Exception:
-            # Fallback safety: never break handlers because of subscription check
-            missing.append(channel)
+async def _is_member(bot: Bot, channel: str, user_id: int) -> Optional[bool]:
+    """Membership according to Telegram, or None when it could not be determined."""
+    try:
+        member = await bot.get_chat_member(chat_id=channel, user_id=user_id)
+    except TelegramAPIError as error:
+        # Network trouble, flood limits, a missing channel or lost admin rights
+        # say nothing about the user.
+        SUBSCRIPTION_STATS["api_errors"] += 1
+        logger.warning("Subscription check for %s in %s failed: %s", user_id, channel, error)
+        return None
+    except Exception:
+        SUBSCRIPTION_STATS["api_errors"] += 1
+        logger.exception("Subscription check for %s in %s failed", user_id, channel)
+        return None
+    if member.status == "restricted":
+        return bool(getattr(member, "is_member", False))
+    return member.status not in {"left", "kicked"}
+
+
+async def _check_channel(bot: Bot, channel: str, user_id: int, force: bool) -> bool:
+    key = f"{user_id}:{channel}"
+    cached = await _SUB_CACHE.aget(key) if not force else None
+    if cached is not None:
+        SUBSCRIPTION_STATS["cache_hits"] += 1
+        return cached
+    SUBSCRIPTION_STATS["api_calls"] += 1
+    subscribed = await _is_member(bot, channel, user_id)
+    if subscribed is None:
+        # Fail open and cache nothing: a Telegram outage or a misconfigured
+        # channel must not lock out subscribers, and the next check asks again.
+        return True
+    await _SUB_CACHE.aset(key, subscribed, SUB_CACHE_TTL if subscribed else SUB_CACHE_NEGATIVE_TTL)
+    return subscribed
+
+
+async def _check_all(bot: Bot, user_id: int, force: bool) -> Tuple[bool, List[str]]:
+    results = await asyncio.gather(*(_check_channel(bot, channel, user_id, force) for channel in SUB_CHANNELS))
+    missing = [channel for channel, subscribed in zip(SUB_CHANNELS, results) if not subscribed]
     return (not missing, missing)
+
+
+async def ensure_subscription(bot: Bot, user: User, force: bool = False) -> Tuple[bool, List[str]]:
+    """Check every channel in SUB_CHANNELS at once; ``force`` bypasses the cache for this user.
+
+    Concurrent non-forced checks for the same user share one in-flight request.
+    """
+    SUBSCRIPTION_STATS["checks"] += 1
+    if force:
+        return await _check_all(bot, user.id, force=True)
+    task = _IN_FLIGHT.get(user.id)
+    if task is not None:
+        SUBSCRIPTION_STATS["coalesced"] += 1
+    else:
+        task = asyncio.ensure_future(_check_all(bot, user.id, force=False))
+        _IN_FLIGHT[user.id] = task
+        task.add_done_callback(lambda _: _IN_FLIGHT.pop(user.id, None))
+    return await asyncio.shield(task)
@@ -1,11 +1,40 @@
+import atexit
+import bisect
+import copy
+import functools
+import itertools
 import json
+import logging
+import os
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from types import MappingProxyType
+from typing import Callable, Dict, FrozenSet, Iterator, List, Mapping, Optional, Set, Tuple, TypeVar
 from datetime import datetime
 
-DB_PATH = Path("database.json")
+from . import journal, log_index, metrics
+from .locks import FileLock
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(os.environ.get("DB_PATH", "database.json"))
 LOG_FILE_PATH = Path("logs.json")
 
+# "json" keeps everything in DB_PATH; "sqlite" swaps the functions below for
+# the ones in bot.utils.sqlite_db (see the end of this module).
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json").lower()
+
+# Mutations arriving within this many seconds are persisted in one write;
+# 0 makes every write_db call write through to disk.
+DB_FLUSH_INTERVAL = float(os.environ.get("DB_FLUSH_INTERVAL", "0.5"))
+
+# Set when several bot processes serve the same files (e.g. webhook workers).
+# Every access then holds an exclusive lock on DB_PATH.lock, re-reads
+# database.json if another process replaced it, and writes changes through
+# before the lock is released.
+DB_SHARED = os.environ.get("DB_SHARED", "0") == "1"
+
 DEFAULT_STATUSES: Dict[str, Dict[str, str]] = {
     "team": {
         "title": "⚙ Команда бота",
@@ -68,23 +97,315 @@ DEFAULT_DB: Dict[str, object] = {
 }
 
 
+# Resident copy of database.json: loaded once, every accessor reads from it and
+# every mutation goes through write_db, which keeps it and the file in sync.
+_DB: Optional[Dict[str, object]] = None
+
+# Casefolded username -> user key. Telegram handles are unique, so when two
+# records claim one handle the most recent claim wins and the others are kept
+# in _USERNAME_CONFLICTS until they are renamed.
+_USERNAME_INDEX: Dict[str, str] = {}
+_USERNAME_CONFLICTS: Dict[str, Set[str]] = {}
+# The indexed handles in sorted order, for prefix lookups.
+_USERNAME_SORTED: List[str] = []
+
+# Status code -> (updated_at, id) of the users currently holding it, kept
+# sorted so category pages can be cut with bisect; the list lengths double as
+# the per-status counters.
+UserOrderKey = Tuple[str, int]
+_STATUS_MEMBERS: Dict[str, List[UserOrderKey]] = {}
+
+LIST_PAGE_SIZE = 20
+PREFIX_SEARCH_LIMIT = 10
+EXPORT_BATCH_SIZE = 500
+
+# Read-only copy of the status catalogue tagged with a version that every
+# status mutation bumps; renders read it without touching storage.
+StatusCatalogue = Tuple[int, Mapping[str, Mapping[str, str]]]
+_STATUS_VERSION = 0
+_STATUS_CATALOGUE: Optional[StatusCatalogue] = None
+
+# (generation, admin ids, moderator ids) for O(1) permission checks; the
+# generation grows whenever either list changes.
+RoleTable = Tuple[int, FrozenSet[int], FrozenSet[int]]
+_ROLE_GENERATION = 0
+_ROLE_TABLE: Optional[RoleTable] = None
+
+# _LOCK guards the resident copy and its indexes. Functions that change them
+# also hold _MUTATION_LOCK (always taken before _LOCK), and flush_db
+# serialises the resident copy under _MUTATION_LOCK alone, so readers keep
+# going while it is dumped. The file is written under _WRITE_LOCK, which never
+# waits on either, so a newer snapshot is never overwritten by an older one.
+_LOCK = threading.RLock()
+_MUTATION_LOCK = threading.RLock()
+_WRITE_LOCK = threading.Lock()
+_FLUSH_WANTED = threading.Condition(_LOCK)
+_DIRTY_SEQ = 0
+_WRITTEN_SEQ = 0
+_FLUSHER: Optional[threading.Thread] = None
+
+_PROCESS_LOCK = FileLock(DB_PATH.with_name(f"{DB_PATH.name}.lock"))
+_PROCESS_LOCK_DEPTH = 0
+# (inode, size, mtime) of database.json as last loaded or written here.
+_DISK_STAMP: Optional[Tuple[int, int, int]] = None
+
+_F = TypeVar("_F", bound=Callable[..., object])
+
+
+def _synchronized(func: _F) -> _F:
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _PROCESS_LOCK_DEPTH
+        with _LOCK:
+            if not DB_SHARED or _PROCESS_LOCK_DEPTH:
+                return func(*args, **kwargs)
+            _PROCESS_LOCK_DEPTH += 1
+            try:
+                with _PROCESS_LOCK:
+                    _drop_if_replaced()
+                    return func(*args, **kwargs)
+            finally:
+                _PROCESS_LOCK_DEPTH -= 1
+
+    return wrapper  # type: ignore[return-value]
+
+
+def _mutating(func: _F) -> _F:
+    synchronized = _synchronized(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _MUTATION_LOCK:
+            return synchronized(*args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def _disk_stamp() -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = DB_PATH.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _drop_if_replaced() -> None:
+    # Another process wrote database.json since we read it: reload on next access.
+    global _DB
+    if _DB is not None and _DIRTY_SEQ == _WRITTEN_SEQ and _disk_stamp() != _DISK_STAMP:
+        _DB = None
+
+
+def _write_text_atomic(path: Path, text: str) -> int:
+    """Replace ``path`` with ``text``; returns the number of bytes written."""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as file:
+        file.write(text)
+        file.flush()
+        os.fsync(file.fileno())
+        size = os.fstat(file.fileno()).st_size
+    os.replace(tmp_path, path)
+    return size
+
+
 def _write_json(path: Path, data: object) -> None:
-    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    _write_text_atomic(path, json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+_DUMP_BATCH_SIZE = 2000
+
+
+def _dump_db(data: Dict[str, object]) -> str:
+    # Users are encoded a batch at a time: one json.dumps of a large base holds
+    # the GIL for seconds, batches let the event loop and readers run between.
+    users = data.get("users", {})
+    parts = []
+    items = iter(users.items())
+    while True:
+        batch = dict(itertools.islice(items, _DUMP_BATCH_SIZE))
+        if not batch:
+            break
+        parts.append(_ENCODER.encode(batch)[1:-1])
+    rest = _ENCODER.encode({key: value for key, value in data.items() if key != "users"})[1:-1]
+    return '{"users":{' + ",".join(parts) + "}" + ("," + rest if rest else "") + "}"
+
+
+def _flusher_loop() -> None:
+    while True:
+        with _LOCK:
+            while _DIRTY_SEQ == _WRITTEN_SEQ:
+                _FLUSH_WANTED.wait()
+        time.sleep(DB_FLUSH_INTERVAL)
+        try:
+            flush_db()
+        except Exception:
+            logger.exception("Failed to flush %s, retrying", DB_PATH)
+
+
+def _schedule_flush() -> None:
+    global _FLUSHER
+    if _FLUSHER is None or not _FLUSHER.is_alive():
+        _FLUSHER = threading.Thread(target=_flusher_loop, name="db-flusher", daemon=True)
+        _FLUSHER.start()
+    _FLUSH_WANTED.notify()
+
+
+def flush_db() -> None:
+    """Write pending changes to database.json and return once they are on disk."""
+    global _WRITTEN_SEQ, _DISK_STAMP
+    started = time.perf_counter()
+    with _MUTATION_LOCK:
+        seq = _DIRTY_SEQ
+        if seq == _WRITTEN_SEQ or _DB is None:
+            return
+        payload = _dump_db(_DB)
+    with _WRITE_LOCK:
+        if seq <= _WRITTEN_SEQ:
+            return
+        written = _write_text_atomic(DB_PATH, payload)
+        _WRITTEN_SEQ = seq
+        _DISK_STAMP = _disk_stamp()
+    metrics.DB_CALLS.inc("flush")
+    metrics.DB_BYTES.inc("flush", amount=written)
+    metrics.DB_LATENCY.observe(time.perf_counter() - started, "flush")
+
+
+atexit.register(flush_db)
+
+
+def _username_key(username: Optional[str]) -> Optional[str]:
+    if not username:
+        return None
+    return username.lstrip("@").casefold() or None
+
+
+def _index_username(handle: Optional[str], key: str, keep_sorted: bool = True) -> None:
+    if not handle:
+        return
+    owner = _USERNAME_INDEX.get(handle)
+    if owner is None and keep_sorted:
+        bisect.insort(_USERNAME_SORTED, handle)
+    if owner is not None and owner != key:
+        claimants = _USERNAME_CONFLICTS.setdefault(handle, {owner})
+        claimants.add(key)
+        logger.warning("Username @%s is claimed by several users: %s", handle, ", ".join(sorted(claimants)))
+    _USERNAME_INDEX[handle] = key
+
+
+def _unindex_username(handle: Optional[str], key: str) -> None:
+    if not handle:
+        return
+    claimants = _USERNAME_CONFLICTS.get(handle)
+    if claimants is not None:
+        claimants.discard(key)
+        if _USERNAME_INDEX.get(handle) == key:
+            _USERNAME_INDEX[handle] = next(iter(claimants))
+        if len(claimants) <= 1:
+            _USERNAME_CONFLICTS.pop(handle)
+    elif _USERNAME_INDEX.get(handle) == key:
+        del _USERNAME_INDEX[handle]
+        position = bisect.bisect_left(_USERNAME_SORTED, handle)
+        if position < len(_USERNAME_SORTED) and _USERNAME_SORTED[position] == handle:
+            del _USERNAME_SORTED[position]
+
+
+def _order_key(key: str, user: Dict[str, object]) -> UserOrderKey:
+    return (user.get("updated_at") or "", int(key))
+
+
+def _index_status(old_status: Optional[str], old_order: Optional[UserOrderKey], new_status: str, new_order: UserOrderKey) -> None:
+    if old_status is not None:
+        members = _STATUS_MEMBERS.get(old_status, [])
+        position = bisect.bisect_left(members, old_order)
+        if position < len(members) and members[position] == old_order:
+            del members[position]
+        if not members:
+            _STATUS_MEMBERS.pop(old_status, None)
+    bisect.insort(_STATUS_MEMBERS.setdefault(new_status, []), new_order)
+
+
+def _rebuild_indexes(data: Dict[str, object]) -> None:
+    _USERNAME_INDEX.clear()
+    _USERNAME_CONFLICTS.clear()
+    _STATUS_MEMBERS.clear()
+    for key, user in data.get("users", {}).items():
+        _index_username(_username_key(user.get("username")), key, keep_sorted=False)
+        _STATUS_MEMBERS.setdefault(user.get("status", "unknown"), []).append(_order_key(key, user))
+    _USERNAME_SORTED[:] = sorted(_USERNAME_INDEX)
+    for members in _STATUS_MEMBERS.values():
+        members.sort()
+
+
+def freeze_statuses(statuses: Dict[str, Dict[str, str]]) -> Mapping[str, Mapping[str, str]]:
+    return MappingProxyType({code: MappingProxyType(dict(data)) for code, data in statuses.items()})
+
+
+# Both are called under _LOCK once the resident copy holds the change, so the
+# snapshots are rebuilt right away and the accessors never have to.
+def _bump_status_version() -> None:
+    global _STATUS_VERSION, _STATUS_CATALOGUE
+    _STATUS_VERSION += 1
+    _STATUS_CATALOGUE = (_STATUS_VERSION, freeze_statuses(_DB.get("statuses", {}))) if _DB is not None else None
+
+
+def _bump_role_generation() -> None:
+    global _ROLE_GENERATION, _ROLE_TABLE
+    _ROLE_GENERATION += 1
+    _ROLE_TABLE = (
+        (_ROLE_GENERATION, frozenset(_DB.get("admins", [])), frozenset(_DB.get("moderators", [])))
+        if _DB is not None
+        else None
+    )
 
 
+def _set_db(data: Dict[str, object]) -> Dict[str, object]:
+    global _DB
+    _DB = data
+    _rebuild_indexes(data)
+    _bump_status_version()
+    _bump_role_generation()
+    return data
+
+
+def _load_db() -> Dict[str, object]:
+    global _DISK_STAMP
+    started = time.perf_counter()
+    with DB_PATH.open("r", encoding="utf-8") as file:
+        _DISK_STAMP = _disk_stamp()
+        data = json.load(file)
+        metrics.DB_BYTES.inc("load", amount=os.fstat(file.fileno()).st_size)
+    metrics.DB_CALLS.inc("load")
+    metrics.DB_LATENCY.observe(time.perf_counter() - started, "load")
+    return _set_db(data)
+
+
+@_mutating
+def reload_db() -> Dict[str, object]:
+    """Drop the resident copy and re-read database.json from disk."""
+    global _DB
+    flush_db()
+    _DB = None
+    return read_db()
+
+
+@_mutating
 def ensure_database() -> None:
     if not DB_PATH.exists():
-        _write_json(DB_PATH, DEFAULT_DB)
+        # read_db serves the defaults (plus anything written since) until now.
+        write_db(read_db(), durable=True)
     else:
         data = read_db()
         changed = False
         if "statuses" not in data:
-            data["statuses"] = DEFAULT_STATUSES
+            data["statuses"] = copy.deepcopy(DEFAULT_STATUSES)
             changed = True
         for code, payload in DEFAULT_STATUSES.items():
             if code not in data["statuses"]:
-                data["statuses"][code] = payload
+                data["statuses"][code] = dict(payload)
                 changed = True
+        if changed:
+            _bump_status_version()
         if "users" not in data:
             data["users"] = {}
             changed = True
@@ -94,31 +415,69 @@ def ensure_database() -> None:
         if "moderators" not in data:
             data["moderators"] = []
             changed = True
-        if "logs" not in data:
-            data["logs"] = []
-            changed = True
         if changed:
             write_db(data)
-    if not LOG_FILE_PATH.exists():
-        _write_json(LOG_FILE_PATH, [])
+    _migrate_logs()
 
 
+def _migrate_logs() -> None:
+    """Move log history kept in database.json / logs.json into the journal once."""
+    data = read_db()
+    embedded = data.pop("logs", None)
+    if journal.is_empty():
+        history = embedded or []
+        if LOG_FILE_PATH.exists():
+            try:
+                legacy = json.loads(LOG_FILE_PATH.read_text(encoding="utf-8"))
+            except json.JSONDecodeError:
+                legacy = []
+            if len(legacy) >= len(history):
+                history = legacy
+        journal.append(history)
+    if embedded is not None:
+        write_db(data, durable=True)
+
+
+@_synchronized
 def read_db() -> Dict[str, object]:
+    metrics.DB_CALLS.inc("read")
+    if _DB is not None:
+        return _DB
     if not DB_PATH.exists():
-        ensure_database()
-    with DB_PATH.open("r", encoding="utf-8") as file:
-        return json.load(file)
-
-
-def write_db(data: Dict[str, object]) -> None:
-    _write_json(DB_PATH, data)
+        # Readers must not take _MUTATION_LOCK (it ranks above _LOCK): serve
+        # the defaults from memory, ensure_database creates the file.
+        return _set_db(copy.deepcopy(DEFAULT_DB))
+    return _load_db()
+
+
+@_mutating
+def write_db(data: Dict[str, object], durable: bool = False) -> None:
+    """Replace the resident copy and queue it for persistence.
+
+    Writes are coalesced and flushed by a background thread after
+    DB_FLUSH_INTERVAL seconds; with ``durable=True`` the call only returns
+    once the data (and anything queued before it) is on disk.
+    """
+    global _DIRTY_SEQ
+    started = time.perf_counter()
+    if data is not _DB:
+        _set_db(data)
+    _DIRTY_SEQ += 1
+    if durable or DB_FLUSH_INTERVAL <= 0 or DB_SHARED:
+        flush_db()
+    else:
+        _schedule_flush()
+    metrics.DB_CALLS.inc("write")
+    metrics.DB_LATENCY.observe(time.perf_counter() - started, "write")
 
 
+@_synchronized
 def get_admins() -> List[int]:
     data = read_db()
     return data.get("admins", [])
 
 
+@_mutating
 def seed_admins(admin_ids: List[int]) -> None:
     data = read_db()
     admins: List[int] = data.setdefault("admins", [])
@@ -129,33 +488,87 @@ def seed_admins(admin_ids: List[int]) -> None:
             updated = True
     if updated:
         data["admins"] = admins
+        _bump_role_generation()
         write_db(data)
 
 
+def role_table() -> RoleTable:
+    """Current (generation, admins, moderators) snapshot; no I/O once built.
+
+    With DB_SHARED, changes made by other processes show up after
+    refresh_snapshots().
+    """
+    return _ROLE_TABLE or _build_role_table()
+
+
+@_synchronized
+def _build_role_table() -> RoleTable:
+    global _ROLE_TABLE
+    if _ROLE_TABLE is None:
+        data = read_db()
+        _ROLE_TABLE = (_ROLE_GENERATION, frozenset(data.get("admins", [])), frozenset(data.get("moderators", [])))
+    return _ROLE_TABLE
+
+
+@_synchronized
 def get_statuses() -> Dict[str, Dict[str, str]]:
     return read_db().get("statuses", {})
 
 
+def status_catalogue() -> StatusCatalogue:
+    """Current (version, read-only statuses) snapshot; no I/O once built.
+
+    With DB_SHARED, changes made by other processes show up after
+    refresh_snapshots().
+    """
+    return _STATUS_CATALOGUE or _build_status_catalogue()
+
+
+@_synchronized
+def _build_status_catalogue() -> StatusCatalogue:
+    global _STATUS_CATALOGUE
+    statuses = read_db().get("statuses", {})
+    if _STATUS_CATALOGUE is None:
+        _STATUS_CATALOGUE = (_STATUS_VERSION, freeze_statuses(statuses))
+    return _STATUS_CATALOGUE
+
+
+@_synchronized
+def refresh_snapshots() -> None:
+    """Reload database.json if another process replaced it (DB_SHARED).
+
+    Blocks on the cross-process lock and may re-parse the whole file, so
+    call it off the event loop (bot.utils.async_db.refresh_snapshots).
+    """
+    read_db()
+
+
+@_mutating
 def save_status(code: str, title: str, description: str, photo: str) -> None:
     data = read_db()
     statuses = data.setdefault("statuses", {})
+    previous = statuses.get(code, {}).get("photo")
     statuses[code] = {"title": title, "description": description, "photo": photo}
+    _forget_file_ids(data, previous, photo)
+    _bump_status_version()
     write_db(data)
 
 
+@_mutating
 def delete_status(code: str) -> bool:
     data = read_db()
-    users = data.get("users", {})
-    if any(user.get("status") == code for user in users.values()):
+    if _STATUS_MEMBERS.get(code):
         return False
     statuses = data.setdefault("statuses", {})
     if code in statuses:
         statuses.pop(code)
+        _bump_status_version()
         write_db(data)
         return True
     return False
 
 
+@_mutating
 def update_status(code: str, title: Optional[str] = None, description: Optional[str] = None, photo: Optional[str] = None) -> bool:
     data = read_db()
     statuses = data.setdefault("statuses", {})
@@ -167,29 +580,111 @@ def update_status(code: str, title: Optional[str] = None, description: Optional[
     if description:
         current["description"] = description
     if photo:
+        _forget_file_ids(data, current.get("photo"), photo)
         current["photo"] = photo
     statuses[code] = current
+    _bump_status_version()
     write_db(data)
     return True
 
 
+def _forget_file_ids(data: Dict[str, object], *photos: Optional[str]) -> None:
+    # The same URL may now serve a different image, so drop both old and new.
+    file_ids = data.get("file_ids", {})
+    for photo in photos:
+        file_ids.pop(photo, None)
+
+
+@_synchronized
+def get_photo_file_id(photo: str) -> Optional[str]:
+    return read_db().get("file_ids", {}).get(photo)
+
+
+@_mutating
+def save_photo_file_id(photo: str, file_id: str) -> None:
+    data = read_db()
+    file_ids = data.setdefault("file_ids", {})
+    if file_ids.get(photo) != file_id:
+        file_ids[photo] = file_id
+        write_db(data)
+
+
+@_mutating
+def drop_photo_file_id(photo: str) -> None:
+    data = read_db()
+    if data.get("file_ids", {}).pop(photo, None) is not None:
+        write_db(data)
+
+
+@_synchronized
 def get_user(identifier: str) -> Optional[Dict[str, object]]:
     data = read_db()
     users = data.get("users", {})
     if identifier in users:
         return users[identifier]
-    for user in users.values():
-        if user.get("username", "").lower() == identifier.lower():
-            return user
-    return None
+    key = _USERNAME_INDEX.get(_username_key(identifier))
+    return users.get(key) if key is not None else None
+
+
+@_synchronized
+def search_users_by_prefix(prefix: str, limit: int = PREFIX_SEARCH_LIMIT) -> List[Dict[str, object]]:
+    """Users whose username starts with ``prefix`` (case-insensitive), in username order."""
+    handle = _username_key(prefix)
+    if not handle:
+        return []
+    users = read_db().get("users", {})
+    start = bisect.bisect_left(_USERNAME_SORTED, handle)
+    matches: List[Dict[str, object]] = []
+    for candidate in _USERNAME_SORTED[start:start + limit]:
+        if not candidate.startswith(handle):
+            break
+        matches.append(users[_USERNAME_INDEX[candidate]])
+    return matches
+
+
+@_synchronized
+def username_conflicts() -> Dict[str, List[int]]:
+    """Handles currently claimed by more than one user record."""
+    return {handle: sorted(int(key) for key in keys) for handle, keys in _USERNAME_CONFLICTS.items()}
 
 
+@_mutating
 def upsert_user(user_id: int, username: Optional[str], status: str, proof: Optional[str], comment: Optional[str], updated_by: int) -> Dict[str, object]:
     data = read_db()
+    result = _apply_upsert(data, user_id, username, status, proof, comment, updated_by)
+    write_db(data)
+    return result
+
+
+@_mutating
+def bulk_upsert_users(rows: List[Dict[str, object]], updated_by: int) -> List[Dict[str, object]]:
+    """Apply many upserts (rows with id, username, status, proof, comment) with a single persist."""
+    data = read_db()
+    results = [
+        _apply_upsert(data, int(row["id"]), row.get("username"), row["status"], row.get("proof"), row.get("comment"), updated_by)
+        for row in rows
+    ]
+    if results:
+        write_db(data)
+    return results
+
+
+def _apply_upsert(
+    data: Dict[str, object],
+    user_id: int,
+    username: Optional[str],
+    status: str,
+    proof: Optional[str],
+    comment: Optional[str],
+    updated_by: int,
+) -> Dict[str, object]:
     users = data.setdefault("users", {})
     key = str(user_id)
     user = users.get(key, {})
     old_status = user.get("status", "unknown")
+    indexed_status = user.get("status", "unknown") if key in users else None
+    indexed_order = _order_key(key, user) if key in users else None
+    old_handle = _username_key(user.get("username"))
     user.update(
         {
             "id": user_id,
@@ -203,70 +698,139 @@ def upsert_user(user_id: int, username: Optional[str], status: str, proof: Optio
     )
     users[key] = user
     data["users"] = users
-    write_db(data)
+    new_handle = _username_key(user.get("username"))
+    if new_handle != old_handle:
+        _unindex_username(old_handle, key)
+    _index_username(new_handle, key)
+    _index_status(indexed_status, indexed_order, status, _order_key(key, user))
     return {"old_status": old_status, "user": user}
 
 
+@_synchronized
 def list_users_by_status(status_code: str) -> List[Dict[str, object]]:
-    data = read_db()
-    users = data.get("users", {})
-    return [user for user in users.values() if user.get("status") == status_code]
+    users = read_db().get("users", {})
+    return [users[str(user_id)] for _, user_id in _STATUS_MEMBERS.get(status_code, ())]
+
+
+def iter_users(status_code: Optional[str] = None, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Dict[str, object]]:
+    """Yield copies of all users (or one category) a batch at a time.
+
+    The lock is taken per batch, so a long export does not hold up writers.
+    """
+    keys = _user_keys(status_code)
+    for start in range(0, len(keys), batch_size):
+        yield from _user_batch(keys[start:start + batch_size])
+
+
+@_synchronized
+def _user_keys(status_code: Optional[str]) -> List[str]:
+    users = read_db().get("users", {})
+    if status_code is None:
+        return list(users)
+    return [str(user_id) for _, user_id in _STATUS_MEMBERS.get(status_code, ())]
+
+
+@_synchronized
+def _user_batch(keys: List[str]) -> List[Dict[str, object]]:
+    users = read_db().get("users", {})
+    return [dict(users[key]) for key in keys if key in users]
+
+
+@_synchronized
+def page_users_by_status(
+    status_code: str,
+    cursor: Optional[UserOrderKey] = None,
+    newer: bool = False,
+    limit: int = LIST_PAGE_SIZE,
+) -> Tuple[List[Dict[str, object]], bool, bool]:
+    """One page of a category, newest first, keyed on (updated_at, id).
+
+    Without ``newer`` the page holds the entries right after ``cursor`` (older
+    ones); with it, the entries right before. Returns the users and whether
+    newer and older pages exist.
+    """
+    users = read_db().get("users", {})
+    members = _STATUS_MEMBERS.get(status_code, [])
+    if newer and cursor is not None:
+        start = bisect.bisect_right(members, cursor)
+        end = min(start + limit, len(members))
+    else:
+        end = bisect.bisect_left(members, cursor) if cursor is not None else len(members)
+        start = max(end - limit, 0)
+    page = [users[str(user_id)] for _, user_id in reversed(members[start:end])]
+    return page, end < len(members), start > 0
+
+
+@_synchronized
+def count_users_by_status(status_code: str) -> int:
+    read_db()
+    return len(_STATUS_MEMBERS.get(status_code, ()))
 
 
+@_synchronized
 def stats_by_status() -> Dict[str, int]:
-    data = read_db()
-    users = data.get("users", {})
-    counts: Dict[str, int] = {}
-    for user in users.values():
-        status = user.get("status", "unknown")
-        counts[status] = counts.get(status, 0) + 1
-    return counts
+    read_db()
+    return {status: len(members) for status, members in _STATUS_MEMBERS.items()}
 
 
+@_synchronized
 def get_moderators() -> List[int]:
     data = read_db()
     return data.get("moderators", [])
 
 
+@_mutating
 def add_moderator(user_id: int) -> None:
     data = read_db()
     mods: List[int] = data.setdefault("moderators", [])
     if user_id not in mods:
         mods.append(user_id)
         data["moderators"] = mods
+        _bump_role_generation()
         write_db(data)
 
 
+@_mutating
 def remove_moderator(user_id: int) -> bool:
     data = read_db()
     mods: List[int] = data.setdefault("moderators", [])
     if user_id in mods:
         mods.remove(user_id)
         data["moderators"] = mods
+        _bump_role_generation()
         write_db(data)
         return True
     return False
 
 
-def get_log_entries() -> List[Dict[str, object]]:
-    data = read_db()
-    return data.get("logs", [])
+def get_log_entries(limit: Optional[int] = None) -> List[Dict[str, object]]:
+    """Moderation log in chronological order; with ``limit`` only the newest entries."""
+    if limit is None:
+        return list(journal.read_all())
+    return journal.read_recent(limit)
+
+
+def query_logs(
+    filters: Optional[log_index.LogFilter] = None,
+    cursor: Optional[int] = None,
+    newer: bool = False,
+    limit: int = log_index.LOG_PAGE_SIZE,
+) -> Tuple[List[Dict[str, object]], bool, bool]:
+    """One page of log entries matching ``filters``, newest first; see log_index.query."""
+    return log_index.query(filters, cursor, newer, limit)
+
+
+def iter_log_entries() -> Iterator[Dict[str, object]]:
+    return journal.read_all()
 
 
 def append_log(entry: Dict[str, object]) -> None:
-    data = read_db()
-    logs: List[Dict[str, object]] = data.setdefault("logs", [])
-    logs.append(entry)
-    data["logs"] = logs
-    write_db(data)
-    history: List[object] = []
-    if LOG_FILE_PATH.exists():
-        try:
-            history = json.loads(LOG_FILE_PATH.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
-            history = []
-    history.append(entry)
-    _write_json(LOG_FILE_PATH, history)
+    append_logs([entry])
+
+
+def append_logs(entries: List[Dict[str, object]]) -> None:
+    journal.append(entries)
+    log_index.follow()
 
 
 def ensure_status_exists(code: str) -> bool:
@@ -295,3 +859,40 @@ def resolve_user(query: str) -> Tuple[str, Optional[Dict[str, object]]]:
     # Treat everything else as a username without @
     user = get_user(cleaned)
     return (cleaned, user)
+
+
+if STORAGE_BACKEND == "sqlite":
+    from .sqlite_db import (  # noqa: F811
+        add_moderator,
+        append_log,
+        append_logs,
+        bulk_upsert_users,
+        count_users_by_status,
+        delete_status,
+        drop_photo_file_id,
+        ensure_database,
+        flush_db,
+        get_admins,
+        get_log_entries,
+        get_moderators,
+        get_photo_file_id,
+        get_statuses,
+        get_user,
+        iter_log_entries,
+        iter_users,
+        list_users_by_status,
+        page_users_by_status,
+        query_logs,
+        refresh_snapshots,
+        remove_moderator,
+        role_table,
+        save_photo_file_id,
+        save_status,
+        search_users_by_prefix,
+        seed_admins,
+        stats_by_status,
+        status_catalogue,
+        update_status,
+        upsert_user,
+        username_conflicts,
+    )
@@ -0,0 +1,54 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from typing import Dict, Iterator, Optional, Tuple
+
+from . import db
+
+EXPORT_USER_COLUMNS = ("id", "username", "status", "proof", "comment", "updated_by", "updated_at")
+EXPORT_LOG_COLUMNS = ("time", "moderator_id", "target_id", "old_status", "new_status", "proof", "comment")
+
+
+def _rows(kind: str, status_code: Optional[str]) -> Tuple[Iterator[Dict[str, object]], Tuple[str, ...]]:
+    if kind == "logs":
+        return db.iter_log_entries(), EXPORT_LOG_COLUMNS
+    return db.iter_users(status_code), EXPORT_USER_COLUMNS
+
+
+def export_filename(kind: str, status_code: Optional[str], fmt: str, compress: bool) -> str:
+    name = f"{kind}-{status_code}" if status_code else kind
+    return f"{name}.{fmt}" + (".gz" if compress else "")
+
+
+def write_export(kind: str, status_code: Optional[str] = None, fmt: str = "csv", compress: bool = False) -> Tuple[str, int]:
+    """Stream users or logs into a temporary file; returns its path and the row count.
+
+    Rows are written as they are read, so memory stays bounded by one storage
+    batch. The caller removes the file once it has been sent.
+    """
+    rows, columns = _rows(kind, status_code)
+    handle, path = tempfile.mkstemp(prefix="export-", suffix=".gz" if compress else f".{fmt}")
+    count = 0
+    try:
+        with os.fdopen(handle, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") if compress else raw as binary:
+                text = io.TextIOWrapper(binary, encoding="utf-8", newline="", write_through=False)
+                if fmt == "csv":
+                    writer = csv.DictWriter(text, fieldnames=columns, extrasaction="ignore")
+                    writer.writeheader()
+                    for row in rows:
+                        writer.writerow(row)
+                        count += 1
+                else:
+                    for row in rows:
+                        text.write(json.dumps(row, ensure_ascii=False) + "\n")
+                        count += 1
+                text.flush()
+                text.detach()
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, count
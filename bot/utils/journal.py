@@ -0,0 +1,174 @@
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from .locks import FileLock
+
+# Moderation log as an append-only stream of JSON lines split into segments.
+# Segment files are named "<index>-<opened at, unix time>.jsonl" so the
+# rotation age is known without reading them.
+LOG_DIR = Path(os.environ.get("LOG_DIR", "moderation_logs"))
+LOG_SEGMENT_MAX_BYTES = int(os.environ.get("LOG_SEGMENT_MAX_BYTES", str(8 * 1024 * 1024)))
+LOG_SEGMENT_MAX_AGE = float(os.environ.get("LOG_SEGMENT_MAX_AGE", str(7 * 24 * 3600)))
+# Several processes append to LOG_DIR (see DB_SHARED in bot.utils.db): appends
+# and rotation then happen under a lock file and follow the newest segment.
+LOG_SHARED = os.environ.get("DB_SHARED", "0") == "1"
+
+_READ_BLOCK = 64 * 1024
+
+_LOCK = threading.Lock()
+_CURRENT: Optional[TextIO] = None
+_CURRENT_PATH: Optional[Path] = None
+_PROCESS_LOCK = FileLock(LOG_DIR / ".lock")
+
+
+def decode(line: bytes) -> Optional[Dict[str, object]]:
+    # A crash can leave a torn last line; skip it rather than failing reads.
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+
+def segment_index(path: Path) -> int:
+    return _segment_info(path)[0]
+
+
+def _segment_info(path: Path) -> Tuple[int, float]:
+    index, opened_at = path.stem.split("-", 1)
+    return int(index), float(opened_at)
+
+
+def segments() -> List[Path]:
+    if not LOG_DIR.exists():
+        return []
+    return sorted(LOG_DIR.glob("*.jsonl"), key=lambda path: _segment_info(path)[0])
+
+
+def _open_segment(index: int) -> Path:
+    global _CURRENT, _CURRENT_PATH
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    path = LOG_DIR / f"{index:06d}-{int(time.time())}.jsonl"
+    _CURRENT = path.open("a", encoding="utf-8")
+    _CURRENT_PATH = path
+    return path
+
+
+def _close_segment() -> None:
+    global _CURRENT, _CURRENT_PATH
+    if _CURRENT is not None:
+        _CURRENT.flush()
+        os.fsync(_CURRENT.fileno())
+        _CURRENT.close()
+    _CURRENT = None
+    _CURRENT_PATH = None
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with path.open("rb") as file:
+        file.seek(-1, os.SEEK_END)
+        return file.read(1) == b"\n"
+
+
+def _writable_segment() -> TextIO:
+    global _CURRENT, _CURRENT_PATH
+    if _CURRENT is None:
+        existing = segments()
+        if existing:
+            _CURRENT_PATH = existing[-1]
+            _CURRENT = _CURRENT_PATH.open("a", encoding="utf-8")
+            if _CURRENT.tell() > 0 and not _ends_with_newline(_CURRENT_PATH):
+                _CURRENT.write("\n")
+        else:
+            _open_segment(1)
+    index, opened_at = _segment_info(_CURRENT_PATH)
+    size = os.fstat(_CURRENT.fileno()).st_size
+    if size >= LOG_SEGMENT_MAX_BYTES or time.time() - opened_at >= LOG_SEGMENT_MAX_AGE:
+        if size > 0:
+            _close_segment()
+            _open_segment(index + 1)
+    return _CURRENT
+
+
+def append(entries: Iterable[Dict[str, object]]) -> None:
+    lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+    if not lines:
+        return
+    with _LOCK, (_PROCESS_LOCK if LOG_SHARED else contextlib.nullcontext()):
+        if LOG_SHARED and _CURRENT_PATH is not None and segments()[-1] != _CURRENT_PATH:
+            _close_segment()
+        segment = _writable_segment()
+        segment.write(lines)
+        segment.flush()
+
+
+def flush() -> None:
+    """Make everything appended by this process visible to readers of the files."""
+    with _LOCK:
+        if _CURRENT is not None:
+            _CURRENT.flush()
+
+
+def close() -> None:
+    with _LOCK:
+        _close_segment()
+
+
+atexit.register(close)
+
+
+def is_empty() -> bool:
+    return all(path.stat().st_size == 0 for path in segments())
+
+
+def _reverse_lines(path: Path) -> Iterator[bytes]:
+    with path.open("rb") as file:
+        file.seek(0, os.SEEK_END)
+        position = file.tell()
+        tail = b""
+        while position > 0:
+            step = min(_READ_BLOCK, position)
+            position -= step
+            file.seek(position)
+            chunk = file.read(step) + tail
+            lines = chunk.split(b"\n")
+            tail = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line
+        if tail.strip():
+            yield tail
+
+
+def read_recent(limit: int) -> List[Dict[str, object]]:
+    """Return the last ``limit`` entries in chronological order, reading from the tail."""
+    flush()
+    paths = segments()
+    recent: List[Dict[str, object]] = []
+    for path in reversed(paths):
+        for line in _reverse_lines(path):
+            if len(recent) >= limit:
+                break
+            entry = decode(line)
+            if entry is not None:
+                recent.append(entry)
+        if len(recent) >= limit:
+            break
+    recent.reverse()
+    return recent
+
+
+def read_all() -> Iterator[Dict[str, object]]:
+    flush()
+    paths = segments()
+    for path in paths:
+        with path.open("rb") as file:
+            for line in file:
+                entry = decode(line) if line.strip() else None
+                if entry is not None:
+                    yield entry
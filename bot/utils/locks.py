@@ -0,0 +1,41 @@
+import threading
+from pathlib import Path
+from typing import Optional, TextIO
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+class FileLock:
+    """Exclusive advisory lock on a file, shared by every process that opens it.
+
+    Threads of one process serialize on an in-process lock first, so the
+    flock itself is only contended between processes. Not reentrant.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._file: Optional[TextIO] = None
+
+    def __enter__(self) -> "FileLock":
+        if fcntl is None:
+            raise RuntimeError("Cross-process locking needs fcntl (Linux/macOS)")
+        self._thread_lock.acquire()
+        try:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = self.path.open("a")
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        try:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
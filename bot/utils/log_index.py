@@ -0,0 +1,180 @@
+"""In-memory index over the moderation journal.
+
+Every entry gets a sequence number (its position in the journal) and the
+index keeps, per sequence number, where the line lives on disk and its time,
+plus the sequence numbers per moderator and per target. Queries pick the
+narrowest of those lists, cut it to the time range with bisect and read
+only the lines they return. The index is built on first use and then follows
+the journal from where it stopped, so new entries cost one short read.
+"""
+
+import bisect
+import itertools
+import threading
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from . import journal
+
+LOG_PAGE_SIZE = 10
+
+# "seq" -> segment index << 40 | byte offset of the line in that segment.
+_POSITIONS = array("q")
+# "seq" -> entry time in unix seconds as a running maximum, so it stays sorted
+# for bisect even if the clock stepped back (entries written right after such
+# a step may fall outside an "until" bound).
+_TIMES = array("d")
+_BY_MODERATOR: Dict[int, array] = {}
+_BY_TARGET: Dict[int, array] = {}
+
+_LOCK = threading.Lock()
+# Journal position indexed so far; nothing is indexed before the first query.
+_SEGMENT = 0
+_OFFSET = 0
+_BUILT = False
+
+_OFFSET_BITS = 40
+
+LogFilter = Dict[str, object]
+
+
+def parse_time(value: object) -> float:
+    try:
+        moment = datetime.fromisoformat(str(value))
+    except ValueError:
+        return 0.0
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _as_int(value: object) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _add(segment: int, offset: int, entry: Dict[str, object]) -> None:
+    seq = len(_POSITIONS)
+    _POSITIONS.append(segment << _OFFSET_BITS | offset)
+    _TIMES.append(max(parse_time(entry.get("time")), _TIMES[-1] if _TIMES else 0.0))
+    moderator_id = _as_int(entry.get("moderator_id"))
+    if moderator_id is not None:
+        _BY_MODERATOR.setdefault(moderator_id, array("q")).append(seq)
+    target_id = _as_int(entry.get("target_id"))
+    if target_id is not None:
+        _BY_TARGET.setdefault(target_id, array("q")).append(seq)
+
+
+def refresh() -> None:
+    """Index whatever was appended to the journal since the last call."""
+    global _SEGMENT, _OFFSET, _BUILT
+    journal.flush()
+    with _LOCK:
+        _BUILT = True
+        for path in journal.segments():
+            segment = journal.segment_index(path)
+            if segment < _SEGMENT:
+                continue
+            position = _OFFSET if segment == _SEGMENT else 0
+            with path.open("rb") as file:
+                file.seek(position)
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break  # still being written
+                    entry = journal.decode(line) if line.strip() else None
+                    if entry is not None:
+                        _add(segment, position, entry)
+                    position += len(line)
+            _SEGMENT, _OFFSET = segment, position
+
+
+def follow() -> None:
+    """Called after appends: keeps an already built index current."""
+    if _BUILT:
+        refresh()
+
+
+def _read(seqs: Sequence[int]) -> List[Dict[str, object]]:
+    paths = {journal.segment_index(path): path for path in journal.segments()}
+    entries: List[Dict[str, object]] = []
+    files = {}
+    try:
+        for seq in seqs:
+            packed = _POSITIONS[seq]
+            segment, offset = packed >> _OFFSET_BITS, packed & ((1 << _OFFSET_BITS) - 1)
+            if segment not in files:
+                files[segment] = paths[segment].open("rb")
+            file = files[segment]
+            file.seek(offset)
+            entry = journal.decode(file.readline()) or {}
+            entry["seq"] = seq
+            entries.append(entry)
+    finally:
+        for file in files.values():
+            file.close()
+    return entries
+
+
+def _matches(entry: Dict[str, object], filters: LogFilter) -> bool:
+    for field in ("moderator_id", "target_id"):
+        if filters.get(field) is not None and _as_int(entry.get(field)) != filters[field]:
+            return False
+    for field in ("old_status", "new_status"):
+        if filters.get(field) and entry.get(field) != filters[field]:
+            return False
+    moment = parse_time(entry.get("time"))
+    if filters.get("since") and moment < parse_time(filters["since"]):
+        return False
+    if filters.get("until") and moment >= parse_time(filters["until"]):
+        return False
+    return True
+
+
+def query(
+    filters: Optional[LogFilter] = None,
+    cursor: Optional[int] = None,
+    newer: bool = False,
+    limit: int = LOG_PAGE_SIZE,
+) -> Tuple[List[Dict[str, object]], bool, bool]:
+    """One page of matching entries, newest first, keyed on "seq".
+
+    Filters: moderator_id, target_id, old_status, new_status and a
+    [since, until) time range as ISO strings. Returns the entries and whether
+    newer and older matches exist, like page_users_by_status.
+    """
+    filters = filters or {}
+    refresh()
+    with _LOCK:
+        lists = [
+            index.get(filters[field], array("q"))
+            for field, index in (("moderator_id", _BY_MODERATOR), ("target_id", _BY_TARGET))
+            if filters.get(field) is not None
+        ]
+        candidates: Sequence[int] = min(lists, key=len) if lists else range(len(_POSITIONS))
+        low = bisect.bisect_left(_TIMES, parse_time(filters["since"])) if filters.get("since") else 0
+        high = bisect.bisect_left(_TIMES, parse_time(filters["until"])) if filters.get("until") else len(_POSITIONS)
+        if cursor is not None:
+            if newer:
+                low = max(low, cursor + 1)
+            else:
+                high = min(high, cursor)
+        start, end = bisect.bisect_left(candidates, low), bisect.bisect_left(candidates, high)
+
+    found: List[Dict[str, object]] = []
+    positions = range(start, end) if newer and cursor is not None else range(end - 1, start - 1, -1)
+    walk = (candidates[position] for position in positions)
+    while len(found) <= limit:
+        batch = list(itertools.islice(walk, limit + 1))
+        if not batch:
+            break
+        found.extend(entry for entry in _read(batch) if _matches(entry, filters))
+
+    more = len(found) > limit
+    page = found[:limit]
+    if newer and cursor is not None:
+        page.reverse()
+        return page, more, True
+    return page, cursor is not None, more
@@ -0,0 +1,37 @@
+from typing import Any
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message
+
+from .async_db import drop_photo_file_id, get_photo_file_id, save_photo_file_id
+
+
+# Bad Request texts that mean the stored file_id itself is no longer usable.
+STALE_FILE_ID_ERRORS = ("wrong file identifier", "wrong remote file identifier", "wrong padding")
+
+
+def _is_remote(photo: str) -> bool:
+    return photo.startswith(("http://", "https://"))
+
+
+async def answer_photo(message: Message, photo: str, **kwargs: Any) -> Message:
+    """Reply with a photo, reusing the Telegram file_id of an earlier upload of the same URL.
+
+    The first send by URL makes Telegram fetch the image; its file_id is stored
+    and used for every later send. A file_id Telegram reports as invalid is
+    dropped and the URL is sent again; other errors are raised as they are.
+    """
+    if not _is_remote(photo):
+        return await message.answer_photo(photo=photo, **kwargs)
+    file_id = await get_photo_file_id(photo)
+    if file_id:
+        try:
+            return await message.answer_photo(photo=file_id, **kwargs)
+        except TelegramBadRequest as error:
+            if not any(text in error.message.lower() for text in STALE_FILE_ID_ERRORS):
+                raise
+            await drop_photo_file_id(photo)
+    sent = await message.answer_photo(photo=photo, **kwargs)
+    if sent.photo:
+        await save_photo_file_id(photo, sent.photo[-1].file_id)
+    return sent
@@ -0,0 +1,160 @@
+"""Process metrics in the Prometheus text format.
+
+Counters and histograms are module-level objects keyed by label values.
+render() produces the exposition text; serve() publishes it on
+http://METRICS_HOST:METRICS_PORT/metrics when METRICS_PORT is set.
+"""
+
+import bisect
+import os
+import threading
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from aiohttp import web
+
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))  # 0 disables the endpoint
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_LOCK = threading.Lock()
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        _METRICS.append(self)
+
+    def inc(self, *values: str, amount: float = 1.0) -> None:
+        with _LOCK:
+            self._values[values] = self._values.get(values, 0.0) + amount
+
+    def value(self, *values: str) -> float:
+        return self._values.get(values, 0.0)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        with _LOCK:
+            items = sorted(self._values.items())
+        for values, total in items:
+            yield f"{self.name}{_labels(self.labels, values)} {_number(total)}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> (count per bucket, the last one for +Inf; sum)
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        _METRICS.append(self)
+
+    def observe(self, value: float, *values: str) -> None:
+        position = bisect.bisect_left(self.buckets, value)
+        with _LOCK:
+            counts, total = self._values.get(values) or self._values.setdefault(values, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[position] += 1
+            total[0] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with _LOCK:
+            items = sorted((values, list(counts), total[0]) for values, (counts, total) in self._values.items())
+        for values, counts, total in items:
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                yield f"{self.name}_bucket{_labels(self.labels, values, le)} {running}"
+            yield f"{self.name}_sum{_labels(self.labels, values)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labels, values)} {running}"
+
+
+StatsDict = Mapping[str, Union[float, Mapping[str, float]]]
+
+_METRICS: List[Union[Counter, Histogram]] = []
+# name -> (help, label for nested dicts, live stats dict owned by another module)
+_STATS: Dict[str, Tuple[str, Optional[str], StatsDict]] = {}
+
+
+def expose_stats(name: str, help_text: str, stats: StatsDict, label: Optional[str] = None) -> None:
+    """Publish a module's stats dict as gauges ``<name>_<key>``; nested dicts use ``label``."""
+    _STATS[name] = (help_text, label, stats)
+
+
+def _render_stats() -> Iterator[str]:
+    for name, (help_text, label, stats) in _STATS.items():
+        series: Dict[str, List[Tuple[str, float]]] = {}
+        for key, value in list(stats.items()):
+            if isinstance(value, Mapping):
+                for field, number in value.items():
+                    series.setdefault(field, []).append((_labels((label or "key",), (key,)), number))
+            else:
+                series.setdefault(key, []).append(("", value))
+        for field, points in series.items():
+            yield f"# HELP {name}_{field} {help_text}"
+            yield f"# TYPE {name}_{field} gauge"
+            for labels, number in points:
+                yield f"{name}_{field}{labels} {_number(number)}"
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in list(_METRICS):
+        lines.extend(metric.render())
+    lines.extend(_render_stats())
+    return "\n".join(lines) + "\n"
+
+
+UPDATES = Counter("bot_updates_total", "Updates received, by update type.", ("type",))
+UPDATE_ERRORS = Counter("bot_update_errors_total", "Updates whose processing raised, by update type.", ("type",))
+UPDATE_LATENCY = Histogram("bot_update_duration_seconds", "Time to process an update, by update type.", ("type",))
+HANDLER_LATENCY = Histogram("bot_handler_duration_seconds", "Handler run time including its middlewares.", ("handler",))
+HANDLER_ERRORS = Counter("bot_handler_errors_total", "Exceptions raised by handlers.", ("handler", "error"))
+API_CALLS = Counter("bot_api_requests_total", "Bot API requests, by method.", ("method",))
+API_ERRORS = Counter("bot_api_errors_total", "Failed Bot API requests, by method and error.", ("method", "error"))
+API_LATENCY = Histogram("bot_api_request_duration_seconds", "Bot API request time, by method.", ("method",))
+# op: read / write are read_db / write_db calls, load / flush the database.json I/O behind them.
+DB_CALLS = Counter("bot_db_calls_total", "Storage calls, by operation.", ("op",))
+DB_BYTES = Counter("bot_db_bytes_total", "Bytes read from or written to database.json.", ("op",))
+DB_LATENCY = Histogram("bot_db_duration_seconds", "Storage call time, by operation.", ("op",))
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(body=render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+
+async def serve(host: str = METRICS_HOST, port: int = METRICS_PORT) -> web.AppRunner:
+    """Start the /metrics endpoint; returns the runner to clean up on exit."""
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
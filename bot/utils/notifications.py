@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import os
+from typing import Dict, Iterable, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+
+from . import metrics
+from .outbound import background_lane
+
+logger = logging.getLogger(__name__)
+
+# Admin notifications are queued per chat and sent as one digest per window.
+# Pacing and flood waits are left to the OutboundLimiter session middleware:
+# digests go out in its background lane, behind replies to users.
+NOTIFY_DIGEST_WINDOW = float(os.environ.get("NOTIFY_DIGEST_WINDOW", "5"))
+
+MESSAGE_LIMIT = 4096
+_SEPARATOR = "\n\n"
+
+_PENDING: Dict[int, List[str]] = {}
+_WORKER: Optional["asyncio.Task[None]"] = None
+_WAKE: Optional[asyncio.Event] = None
+
+NOTIFY_STATS: Dict[str, int] = {"queued": 0, "digests": 0, "sent": 0, "failed": 0}
+# chat id -> last delivery error, cleared by the next successful send.
+NOTIFY_FAILURES: Dict[int, str] = {}
+metrics.expose_stats("bot_notify", "Admin notification digest counters.", NOTIFY_STATS)
+
+
+def enqueue(bot: Bot, chat_ids: Iterable[int], text: str) -> None:
+    """Queue ``text`` for every chat; it goes out with the next digest."""
+    global _WORKER, _WAKE
+    for chat_id in chat_ids:
+        _PENDING.setdefault(chat_id, []).append(text)
+        NOTIFY_STATS["queued"] += 1
+    if _WORKER is None or _WORKER.done():
+        _WAKE = asyncio.Event()
+        _WORKER = asyncio.create_task(_run(bot, _WAKE))
+
+
+def build_digests(events: List[str]) -> List[str]:
+    """Join events into as few messages as fit the Telegram length limit."""
+    messages: List[str] = []
+    current = ""
+    for event in events:
+        event = event[:MESSAGE_LIMIT]
+        if current and len(current) + len(_SEPARATOR) + len(event) > MESSAGE_LIMIT:
+            messages.append(current)
+            current = event
+        else:
+            current = f"{current}{_SEPARATOR}{event}" if current else event
+    if current:
+        messages.append(current)
+    header = f"🗂 Сводка действий ({len(events)}):{_SEPARATOR}"
+    if len(events) > 1 and len(header) + len(messages[0]) <= MESSAGE_LIMIT:
+        messages[0] = header + messages[0]
+    return messages
+
+
+async def _run(bot: Bot, wake: asyncio.Event) -> None:
+    while _PENDING:
+        try:
+            await asyncio.wait_for(wake.wait(), NOTIFY_DIGEST_WINDOW)
+        except asyncio.TimeoutError:
+            pass
+        batch = dict(_PENDING)
+        _PENDING.clear()
+        await asyncio.gather(*(_deliver(bot, chat_id, events) for chat_id, events in batch.items()))
+
+
+async def _deliver(bot: Bot, chat_id: int, events: List[str]) -> None:
+    for text in build_digests(events):
+        NOTIFY_STATS["digests"] += 1
+        if not await _send(bot, chat_id, text):
+            # The chat is unreachable for now: skip the rest of this batch.
+            return
+
+
+async def _send(bot: Bot, chat_id: int, text: str) -> bool:
+    # One attempt: the limiter has already waited out and retried flood limits.
+    try:
+        with background_lane():
+            await bot.send_message(chat_id, text)
+    except TelegramAPIError as error:
+        logger.warning("Failed to notify %s: %s", chat_id, error)
+        NOTIFY_FAILURES[chat_id] = str(error)
+    except Exception as error:
+        logger.exception("Failed to notify %s", chat_id)
+        NOTIFY_FAILURES[chat_id] = str(error)
+    else:
+        NOTIFY_STATS["sent"] += 1
+        NOTIFY_FAILURES.pop(chat_id, None)
+        return True
+    NOTIFY_STATS["failed"] += 1
+    return False
+
+
+async def drain() -> None:
+    """Send whatever is queued now instead of waiting for the window; used on shutdown."""
+    if _WAKE is not None:
+        _WAKE.set()
+    if _WORKER is not None and not _WORKER.done():
+        await _WORKER
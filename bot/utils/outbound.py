@@ -0,0 +1,191 @@
+"""Pacing for requests the bot sends to the Telegram Bot API.
+
+OutboundLimiter is a session request middleware: message-sending methods
+take a token from a global bucket and from a small per-chat one, waiters
+are served interactive lane first, and TelegramRetryAfter pauses the chat
+(or everything) for the requested time before the call is retried.
+"""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from . import metrics
+
+TELEGRAM_POOL_SIZE = int(os.environ.get("TELEGRAM_POOL_SIZE", "100"))
+OUTBOUND_GLOBAL_RATE = float(os.environ.get("OUTBOUND_GLOBAL_RATE", "30"))
+OUTBOUND_CHAT_RATE = float(os.environ.get("OUTBOUND_CHAT_RATE", "1"))
+OUTBOUND_CHAT_BURST = float(os.environ.get("OUTBOUND_CHAT_BURST", "3"))
+OUTBOUND_MAX_RETRIES = int(os.environ.get("OUTBOUND_MAX_RETRIES", "3"))
+# Per-chat buckets are dropped once they refill, checked when the table grows past this.
+CHAT_TABLE_PRUNE_SIZE = 100_000
+
+INTERACTIVE = 0
+BACKGROUND = 1
+LANE_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+_LANE: ContextVar[int] = ContextVar("outbound_lane", default=INTERACTIVE)
+
+# Methods that count against Telegram's message limits.
+_LIMITED_PREFIXES = ("send", "edit", "copy", "forward")
+
+
+@contextlib.contextmanager
+def background_lane() -> Iterator[None]:
+    """Requests made inside the block wait behind interactive ones."""
+    token = _LANE.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _LANE.reset(token)
+
+
+class PriorityTokenBucket:
+    """Token bucket whose waiters are released lowest lane first, FIFO within a lane."""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._pump: Optional[asyncio.Task] = None
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def _take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if now < self.paused_until or self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    async def acquire(self, lane: int) -> None:
+        if not self._waiters and self._take():
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (lane, next(self._order), future))
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._release_waiters())
+        await future
+
+    async def _release_waiters(self) -> None:
+        while self._waiters:
+            if self._waiters[0][2].done():  # cancelled while waiting
+                heapq.heappop(self._waiters)
+                continue
+            if self._take():
+                heapq.heappop(self._waiters)[2].set_result(None)
+                continue
+            now = time.monotonic()
+            await asyncio.sleep(max(self.paused_until - now, (1 - self.tokens) / self.rate, 0.001))
+
+
+# Per lane: requests waiting right now (queue depth), requests passed, how
+# many had to wait, and the total / worst time spent waiting (seconds).
+OUTBOUND_STATS: Dict[str, Dict[str, float]] = {
+    name: {"queued": 0, "requests": 0, "waited": 0, "wait_seconds": 0.0, "max_wait": 0.0} for name in LANE_NAMES.values()
+}
+OUTBOUND_RETRY_AFTER: Dict[str, int] = {"received": 0, "gave_up": 0}
+metrics.expose_stats("bot_outbound", "Outbound limiter counters per lane.", OUTBOUND_STATS, label="lane")
+metrics.expose_stats("bot_outbound_retry_after", "Flood waits received from Telegram.", OUTBOUND_RETRY_AFTER)
+
+
+class OutboundLimiter(BaseRequestMiddleware):
+    def __init__(
+        self,
+        rate: float = OUTBOUND_GLOBAL_RATE,
+        chat_rate: float = OUTBOUND_CHAT_RATE,
+        chat_burst: float = OUTBOUND_CHAT_BURST,
+        max_retries: int = OUTBOUND_MAX_RETRIES,
+    ) -> None:
+        self.bucket = PriorityTokenBucket(rate, burst=rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        # chat id -> (tokens, refreshed at); negative tokens are time already promised to waiters
+        self._chats: Dict[object, Tuple[float, float]] = {}
+        self._prune_at = CHAT_TABLE_PRUNE_SIZE
+
+    def _chat_delay(self, chat_id: object) -> float:
+        now = time.monotonic()
+        tokens, updated = self._chats.get(chat_id, (self.chat_burst, now))
+        tokens = min(self.chat_burst, tokens + (now - updated) * self.chat_rate) - 1
+        self._chats[chat_id] = (tokens, now)
+        if len(self._chats) > self._prune_at:
+            self._prune(now)
+        return max(-tokens / self.chat_rate, 0.0)
+
+    def _prune(self, now: float) -> None:
+        # Chats whose bucket has refilled behave exactly like unseen ones.
+        self._chats = {
+            key: (tokens, updated)
+            for key, (tokens, updated) in self._chats.items()
+            if tokens + (now - updated) * self.chat_rate < self.chat_burst
+        }
+        # If most chats are still active, wait for the table to double before the next pass.
+        self._prune_at = max(CHAT_TABLE_PRUNE_SIZE, 2 * len(self._chats))
+
+    async def _wait_for_turn(self, chat_id: object, lane: int) -> None:
+        stats = OUTBOUND_STATS[LANE_NAMES[lane]]
+        started = time.monotonic()
+        stats["queued"] += 1
+        try:
+            if chat_id is not None:
+                delay = self._chat_delay(chat_id)
+                if delay:
+                    await asyncio.sleep(delay)
+            await self.bucket.acquire(lane)
+        finally:
+            stats["queued"] -= 1
+        waited = time.monotonic() - started
+        stats["requests"] += 1
+        if waited > 0.001:
+            stats["waited"] += 1
+            stats["wait_seconds"] += waited
+            stats["max_wait"] = max(stats["max_wait"], waited)
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        limited = method.__api_method__.lower().startswith(_LIMITED_PREFIXES)
+        chat_id = getattr(method, "chat_id", None)
+        lane = _LANE.get()
+        retries = 0
+        while True:
+            if limited:
+                await self._wait_for_turn(chat_id, lane)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as error:
+                OUTBOUND_RETRY_AFTER["received"] += 1
+                retries += 1
+                if retries > self.max_retries:
+                    OUTBOUND_RETRY_AFTER["gave_up"] += 1
+                    raise
+                if not limited:
+                    await asyncio.sleep(error.retry_after)
+                elif chat_id is not None:
+                    # The next slot for this chat opens once the flood wait is over.
+                    self._chats[chat_id] = (1 - error.retry_after * self.chat_rate, time.monotonic())
+                else:
+                    self.bucket.pause(error.retry_after)
@@ -0,0 +1,601 @@
+"""SQLite implementation of the storage API in bot.utils.db.
+
+Enabled with STORAGE_BACKEND=sqlite; bot.utils.db then re-exports the
+functions below under the same names. Run ``python -m bot.utils.sqlite_db``
+once to import an existing database.json and its log history.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import journal
+from .log_index import LOG_PAGE_SIZE, LogFilter
+from .db import (
+    DB_PATH,
+    DEFAULT_DB,
+    DEFAULT_STATUSES,
+    EXPORT_BATCH_SIZE,
+    LIST_PAGE_SIZE,
+    LOG_FILE_PATH,
+    PREFIX_SEARCH_LIMIT,
+    RoleTable,
+    StatusCatalogue,
+    UserOrderKey,
+    freeze_statuses,
+)
+
+SQLITE_PATH = Path(os.environ.get("SQLITE_PATH", "database.sqlite3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    username TEXT,
+    username_lower TEXT,
+    status TEXT NOT NULL,
+    proof TEXT NOT NULL DEFAULT '',
+    comment TEXT NOT NULL DEFAULT '',
+    updated_by INTEGER,
+    updated_at TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS users_username_lower ON users (username_lower);
+CREATE INDEX IF NOT EXISTS users_status ON users (status, updated_at, id);
+
+CREATE TABLE IF NOT EXISTS statuses (
+    code TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    photo TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS photo_file_ids (
+    photo TEXT PRIMARY KEY,
+    file_id TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS admins (user_id INTEGER PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS moderators (user_id INTEGER PRIMARY KEY);
+
+CREATE TABLE IF NOT EXISTS logs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    time TEXT NOT NULL,
+    moderator_id INTEGER,
+    target_id INTEGER,
+    old_status TEXT,
+    new_status TEXT,
+    proof TEXT,
+    comment TEXT
+);
+CREATE INDEX IF NOT EXISTS logs_time ON logs (time);
+CREATE INDEX IF NOT EXISTS logs_moderator ON logs (moderator_id, seq);
+CREATE INDEX IF NOT EXISTS logs_target ON logs (target_id, seq);
+
+-- Bumped on every statuses change so other processes can tell their
+-- cached catalogue is stale (see DB_SHARED).
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('statuses_version', 0);
+CREATE TRIGGER IF NOT EXISTS statuses_insert AFTER INSERT ON statuses
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'statuses_version'; END;
+CREATE TRIGGER IF NOT EXISTS statuses_update AFTER UPDATE ON statuses
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'statuses_version'; END;
+CREATE TRIGGER IF NOT EXISTS statuses_delete AFTER DELETE ON statuses
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'statuses_version'; END;
+
+-- Same for the role lists.
+INSERT OR IGNORE INTO meta (key, value) VALUES ('roles_version', 0);
+CREATE TRIGGER IF NOT EXISTS admins_insert AFTER INSERT ON admins
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'roles_version'; END;
+CREATE TRIGGER IF NOT EXISTS admins_delete AFTER DELETE ON admins
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'roles_version'; END;
+CREATE TRIGGER IF NOT EXISTS moderators_insert AFTER INSERT ON moderators
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'roles_version'; END;
+CREATE TRIGGER IF NOT EXISTS moderators_delete AFTER DELETE ON moderators
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'roles_version'; END;
+"""
+
+USER_COLUMNS = "id, username, status, proof, comment, updated_by, updated_at"
+LOG_COLUMNS = "time, moderator_id, target_id, old_status, new_status, proof, comment"
+
+_LOCAL = threading.local()
+_SCHEMA_READY = False
+# SQLite allows one writer at a time; serializing in-process writers avoids
+# spinning on busy_timeout between our own threads.
+_WRITE_LOCK = threading.Lock()
+
+_STATUS_VERSION = 0
+_STATUS_CATALOGUE: Optional[StatusCatalogue] = None
+_STATUSES_SEEN = -1
+
+_ROLE_GENERATION = 0
+_ROLE_TABLE: Optional[RoleTable] = None
+_ROLES_SEEN = -1
+
+
+def _connect() -> sqlite3.Connection:
+    global _SCHEMA_READY
+    conn: Optional[sqlite3.Connection] = getattr(_LOCAL, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(SQLITE_PATH, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _LOCAL.conn = conn
+    if not _SCHEMA_READY:
+        # Roles are seeded at import time, before main() calls ensure_database.
+        with _WRITE_LOCK:
+            conn.executescript(SCHEMA)
+        _SCHEMA_READY = True
+    return conn
+
+
+def _user_row(row: Optional[sqlite3.Row]) -> Optional[Dict[str, object]]:
+    if row is None:
+        return None
+    return {key: row[key] for key in row.keys()}
+
+
+def _log_row(row: sqlite3.Row) -> Dict[str, object]:
+    # Every column is present; fields missing from imported legacy entries are None.
+    return {key: row[key] for key in LOG_COLUMNS.split(", ")}
+
+
+# Called after each change is committed: the snapshot is rebuilt by the
+# (executor) thread that made it, so the accessors never query.
+def _bump_status_version() -> None:
+    global _STATUS_VERSION, _STATUS_CATALOGUE
+    _STATUS_VERSION += 1
+    version = _STATUS_VERSION
+    catalogue = (version, freeze_statuses(get_statuses()))
+    if version == _STATUS_VERSION:
+        _STATUS_CATALOGUE = catalogue
+
+
+def ensure_database() -> None:
+    conn = _connect()
+    with _WRITE_LOCK, conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO statuses (code, title, description, photo) VALUES (?, ?, ?, ?)",
+            [(code, data["title"], data["description"], data["photo"]) for code, data in DEFAULT_STATUSES.items()],
+        )
+    _bump_status_version()
+
+
+def flush_db() -> None:
+    # Every write is committed as it happens.
+    return None
+
+
+def get_admins() -> List[int]:
+    return [row[0] for row in _connect().execute("SELECT user_id FROM admins ORDER BY rowid")]
+
+
+def seed_admins(admin_ids: List[int]) -> None:
+    conn = _connect()
+    with _WRITE_LOCK, conn:
+        conn.executemany("INSERT OR IGNORE INTO admins (user_id) VALUES (?)", [(admin_id,) for admin_id in admin_ids])
+    _bump_role_generation()
+
+
+def _bump_role_generation() -> None:
+    global _ROLE_GENERATION, _ROLE_TABLE
+    _ROLE_GENERATION += 1
+    generation = _ROLE_GENERATION
+    table = (generation, frozenset(get_admins()), frozenset(get_moderators()))
+    if generation == _ROLE_GENERATION:
+        _ROLE_TABLE = table
+
+
+def role_table() -> RoleTable:
+    """Current (generation, admins, moderators) snapshot; no I/O once built.
+
+    With DB_SHARED, changes made by other processes show up after
+    refresh_snapshots().
+    """
+    while _ROLE_TABLE is None:
+        _bump_role_generation()
+    return _ROLE_TABLE
+
+
+def get_statuses() -> Dict[str, Dict[str, str]]:
+    rows = _connect().execute("SELECT code, title, description, photo FROM statuses ORDER BY rowid")
+    return {row["code"]: {"title": row["title"], "description": row["description"], "photo": row["photo"]} for row in rows}
+
+
+def status_catalogue() -> StatusCatalogue:
+    """Current (version, read-only statuses) snapshot; no I/O once built.
+
+    With DB_SHARED, changes made by other processes show up after
+    refresh_snapshots().
+    """
+    while _STATUS_CATALOGUE is None:
+        _bump_status_version()
+    return _STATUS_CATALOGUE
+
+
+def refresh_snapshots() -> None:
+    """Rebuild the role table and catalogue if another process changed them.
+
+    Queries the database, so call it off the event loop
+    (bot.utils.async_db.refresh_snapshots).
+    """
+    global _ROLES_SEEN, _STATUSES_SEEN
+    versions = dict(_connect().execute("SELECT key, value FROM meta WHERE key IN ('roles_version', 'statuses_version')"))
+    if versions["roles_version"] != _ROLES_SEEN:
+        _ROLES_SEEN = versions["roles_version"]
+        _bump_role_generation()
+    if versions["statuses_version"] != _STATUSES_SEEN:
+        _STATUSES_SEEN = versions["statuses_version"]
+        _bump_status_version()
+
+
+def save_status(code: str, title: str, description: str, photo: str) -> None:
+    conn = _connect()
+    with _WRITE_LOCK, conn:
+        previous = conn.execute("SELECT photo FROM statuses WHERE code = ?", (code,)).fetchone()
+        _forget_file_ids(conn, previous[0] if previous else None, photo)
+        conn.execute(
+            "INSERT INTO statuses (code, title, description, photo) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (code) DO UPDATE SET title = excluded.title, description = excluded.description, photo = excluded.photo",
+            (code, title, description, photo),
+        )
+    _bump_status_version()
+
+
+def delete_status(code: str) -> bool:
+    conn = _connect()
+    with _WRITE_LOCK, conn:
+        if conn.execute("SELECT 1 FROM users WHERE status = ? LIMIT 1", (code,)).fetchone():
+            return False
+        removed = conn.execute("DELETE FROM statuses WHERE code = ?", (code,)).rowcount > 0
+    if removed:
+        _bump_status_version()
+    return removed
+
+
+def update_status(code: str, title: Optional[str] = None, description: Optional[str] = None, photo: Optional[str] = None) -> bool:
+    changes = {field: value for field, value in (("title", title), ("description", description), ("photo", photo)) if value}
+    conn = _connect()
+    with _WRITE_LOCK, conn:
+        current = conn.execute("SELECT photo FROM statuses WHERE code = ?", (code,)).fetchone()
+        if current is None:
+            return False
+        if photo:
+            _forget_file_ids(conn, current[0], photo)
+        if changes:
+            assignments = ", ".join(f"{field} = ?" for field in changes)
+            conn.execute(f"UPDATE statuses SET {assignments} WHERE code = ?", (*changes.values(), code))
+    if changes:
+        _bump_status_version()
+    return True
+
+
+def _forget_file_ids(conn: sqlite3.Connection, *photos: Optional[str]) -> None:
+    # The same URL may now serve a different image, so drop both old and new.
+    conn.executemany("DELETE FROM photo_file_ids WHERE photo = ?", [(photo,) for photo in photos if photo])
+
+
+def get_photo_file_id(photo: str) -> Optional[str]:
+    row = _connect().execute("SELECT file_id FROM photo_file_ids WHERE photo = ?", (photo,)).fetchone()
+    return row[0] if row else None
+
+
+def save_photo_file_id(photo: str, file_id: str) -> None:
+    conn = _connect()
+    with _WRITE_LOCK, conn:
+        conn.execute("INSERT OR REPLACE INTO photo_file_ids (photo, file_id) VALUES (?, ?)", (photo, file_id))
+
+
+def drop_photo_file_id(photo: str) -> None:
+    conn = _connect()
+    with _WRITE_LOCK, conn:
+        conn.execute("DELETE FROM photo_file_ids WHERE photo = ?", (photo,))
+
+
+def get_user(identifier: str) -> Optional[Dict[str, object]]:
+    conn = _connect()
+    if identifier.isdigit():
+        row = conn.execute(f"SELECT {USER_COLUMNS} FROM users WHERE id = ?", (int(identifier),)).fetchone()
+        if row is not None:
+            return _user_row(row)
+    row = conn.execute(
+        f"SELECT {USER_COLUMNS} FROM users WHERE username_lower = ? ORDER BY updated_at DESC LIMIT 1",
+        (identifier.lstrip("@").casefold(),),
+    ).fetchone()
+    return _user_row(row)
+
+
+def search_users_by_prefix(prefix: str, limit: int = PREFIX_SEARCH_LIMIT) -> List[Dict[str, object]]:
+    """Users whose username starts with ``prefix`` (case-insensitive), in username order."""
+    handle = prefix.lstrip("@").casefold()
+    if not handle:
+        return []
+    rows = _connect().execute(
+        f"SELECT {USER_COLUMNS} FROM users WHERE username_lower >= ? AND username_lower < ? ORDER BY username_lower LIMIT ?",
+        (handle, handle + "\U0010ffff", limit),
+    )
+    return [_user_row(row) for row in rows]
+
+
+def username_conflicts() -> Dict[str, List[int]]:
+    """Handles currently claimed by more than one user record."""
+    rows = _connect().execute(
+        "SELECT username_lower, group_concat(id) FROM users WHERE username_lower IS NOT NULL "
+        "GROUP BY username_lower HAVING count(*) > 1"
+    )
+    return {handle: sorted(int(user_id) for user_id in ids.split(",")) for handle, ids in rows}
+
+
+def upsert_user(user_id: int, username: Optional[str], status: str, proof: Optional[str], comment: Optional[str], updated_by: int) -> Dict[str, object]:
+    conn = _connect()
+    with _WRITE_LOCK, conn:
+        return _apply_upsert(conn, user_id, username, status, proof, comment, updated_by)
+
+
+def bulk_upsert_users(rows: List[Dict[str, object]], updated_by: int) -> List[Dict[str, object]]:
+    """Apply many upserts (rows with id, username, status, proof, comment) in one transaction."""
+    conn = _connect()
+    with _WRITE_LOCK, conn:
+        return [
+            _apply_upsert(conn, int(row["id"]), row.get("username"), row["status"], row.get("proof"), row.get("comment"), updated_by)
+            for row in rows
+        ]
+
+
+def _apply_upsert(
+    conn: sqlite3.Connection,
+    user_id: int,
+    username: Optional[str],
+    status: str,
+    proof: Optional[str],
+    comment: Optional[str],
+    updated_by: int,
+) -> Dict[str, object]:
+    current = _user_row(conn.execute(f"SELECT {USER_COLUMNS} FROM users WHERE id = ?", (user_id,)).fetchone()) or {}
+    user = {
+        "id": user_id,
+        "username": username or current.get("username"),
+        "status": status,
+        "proof": proof or "",
+        "comment": comment or "",
+        "updated_by": updated_by,
+        "updated_at": datetime.utcnow().isoformat(),
+    }
+    _write_user(conn, user)
+    return {"old_status": current.get("status", "unknown"), "user": user}
+
+
+def _write_user(conn: sqlite3.Connection, user: Dict[str, object]) -> None:
+    username = user.get("username")
+    conn.execute(
+        "INSERT OR REPLACE INTO users (id, username, username_lower, status, proof, comment, updated_by, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            int(user["id"]),
+            username,
+            username.lstrip("@").casefold() if username else None,
+            user.get("status", "unknown"),
+            user.get("proof") or "",
+            user.get("comment") or "",
+            user.get("updated_by"),
+            user.get("updated_at") or "",
+        ),
+    )
+
+
+def list_users_by_status(status_code: str) -> List[Dict[str, object]]:
+    rows = _connect().execute(f"SELECT {USER_COLUMNS} FROM users WHERE status = ? ORDER BY updated_at, id", (status_code,))
+    return [_user_row(row) for row in rows]
+
+
+def iter_users(status_code: Optional[str] = None, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Dict[str, object]]:
+    """Yield all users (or one category) in keyset-paginated batches."""
+    conn = _connect()
+    if status_code is None:
+        query = f"SELECT {USER_COLUMNS} FROM users WHERE id > ? ORDER BY id LIMIT ?"
+        key: Tuple[object, ...] = (-1,)
+    else:
+        # Walks the users_status index in (updated_at, id) order.
+        query = f"SELECT {USER_COLUMNS} FROM users WHERE status = ? AND (updated_at, id) > (?, ?) ORDER BY updated_at, id LIMIT ?"
+        key = ("", -1)
+    while True:
+        params = (*key, batch_size) if status_code is None else (status_code, *key, batch_size)
+        rows = conn.execute(query, params).fetchall()
+        for row in rows:
+            yield _user_row(row)
+        if len(rows) < batch_size:
+            return
+        last = rows[-1]
+        key = (last["id"],) if status_code is None else (last["updated_at"], last["id"])
+
+
+def page_users_by_status(
+    status_code: str,
+    cursor: Optional[UserOrderKey] = None,
+    newer: bool = False,
+    limit: int = LIST_PAGE_SIZE,
+) -> Tuple[List[Dict[str, object]], bool, bool]:
+    """One page of a category, newest first, keyed on (updated_at, id).
+
+    Without ``newer`` the page holds the entries right after ``cursor`` (older
+    ones); with it, the entries right before. Returns the users and whether
+    newer and older pages exist.
+    """
+    conn = _connect()
+    if newer and cursor is not None:
+        rows = conn.execute(
+            f"SELECT {USER_COLUMNS} FROM users WHERE status = ? AND (updated_at, id) > (?, ?) ORDER BY updated_at, id LIMIT ?",
+            (status_code, *cursor, limit),
+        ).fetchall()
+        rows.reverse()
+    else:
+        condition, params = ("AND (updated_at, id) < (?, ?) ", cursor) if cursor is not None else ("", ())
+        rows = conn.execute(
+            f"SELECT {USER_COLUMNS} FROM users WHERE status = ? {condition}ORDER BY updated_at DESC, id DESC LIMIT ?",
+            (status_code, *params, limit),
+        ).fetchall()
+    newest = (rows[0]["updated_at"], rows[0]["id"]) if rows else cursor
+    oldest = (rows[-1]["updated_at"], rows[-1]["id"]) if rows else cursor
+    has_newer = newest is not None and _exists_beyond(conn, status_code, newest, ">")
+    has_older = oldest is not None and _exists_beyond(conn, status_code, oldest, "<")
+    return [_user_row(row) for row in rows], has_newer, has_older
+
+
+def _exists_beyond(conn: sqlite3.Connection, status_code: str, key: UserOrderKey, operator: str) -> bool:
+    row = conn.execute(f"SELECT 1 FROM users WHERE status = ? AND (updated_at, id) {operator} (?, ?) LIMIT 1", (status_code, *key))
+    return row.fetchone() is not None
+
+
+def count_users_by_status(status_code: str) -> int:
+    return _connect().execute("SELECT count(*) FROM users WHERE status = ?", (status_code,)).fetchone()[0]
+
+
+def stats_by_status() -> Dict[str, int]:
+    return dict(_connect().execute("SELECT status, count(*) FROM users GROUP BY status").fetchall())
+
+
+def get_moderators() -> List[int]:
+    return [row[0] for row in _connect().execute("SELECT user_id FROM moderators ORDER BY rowid")]
+
+
+def add_moderator(user_id: int) -> None:
+    conn = _connect()
+    with _WRITE_LOCK, conn:
+        conn.execute("INSERT OR IGNORE INTO moderators (user_id) VALUES (?)", (user_id,))
+    _bump_role_generation()
+
+
+def remove_moderator(user_id: int) -> bool:
+    conn = _connect()
+    with _WRITE_LOCK, conn:
+        removed = conn.execute("DELETE FROM moderators WHERE user_id = ?", (user_id,)).rowcount > 0
+    _bump_role_generation()
+    return removed
+
+
+def get_log_entries(limit: Optional[int] = None) -> List[Dict[str, object]]:
+    """Moderation log in chronological order; with ``limit`` only the newest entries."""
+    conn = _connect()
+    if limit is None:
+        return [_log_row(row) for row in conn.execute(f"SELECT {LOG_COLUMNS} FROM logs ORDER BY seq")]
+    rows = conn.execute(f"SELECT {LOG_COLUMNS} FROM logs ORDER BY seq DESC LIMIT ?", (limit,)).fetchall()
+    return [_log_row(row) for row in reversed(rows)]
+
+
+def query_logs(
+    filters: Optional[LogFilter] = None,
+    cursor: Optional[int] = None,
+    newer: bool = False,
+    limit: int = LOG_PAGE_SIZE,
+) -> Tuple[List[Dict[str, object]], bool, bool]:
+    """One page of log entries matching ``filters``, newest first, keyed on seq."""
+    filters = filters or {}
+    clauses: List[str] = []
+    params: List[object] = []
+    for field in ("moderator_id", "target_id", "old_status", "new_status"):
+        if filters.get(field) not in (None, ""):
+            clauses.append(f"{field} = ?")
+            params.append(filters[field])
+    if filters.get("since"):
+        clauses.append("time >= ?")
+        params.append(filters["since"])
+    if filters.get("until"):
+        clauses.append("time < ?")
+        params.append(filters["until"])
+    ascending = newer and cursor is not None
+    if cursor is not None:
+        clauses.append("seq > ?" if ascending else "seq < ?")
+        params.append(cursor)
+    where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+    rows = _connect().execute(
+        f"SELECT seq, {LOG_COLUMNS} FROM logs {where}ORDER BY seq {'ASC' if ascending else 'DESC'} LIMIT ?",
+        (*params, limit + 1),
+    ).fetchall()
+    more = len(rows) > limit
+    page = []
+    for row in rows[:limit]:
+        entry = _log_row(row)
+        entry["seq"] = row["seq"]
+        page.append(entry)
+    if ascending:
+        page.reverse()
+        return page, more, True
+    return page, cursor is not None, more
+
+
+def iter_log_entries(batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Dict[str, object]]:
+    conn = _connect()
+    last_seq = 0
+    while True:
+        rows = conn.execute(f"SELECT seq, {LOG_COLUMNS} FROM logs WHERE seq > ? ORDER BY seq LIMIT ?", (last_seq, batch_size)).fetchall()
+        for row in rows:
+            yield _log_row(row)
+        if len(rows) < batch_size:
+            return
+        last_seq = rows[-1]["seq"]
+
+
+def _insert_logs(conn: sqlite3.Connection, entries: Iterable[Dict[str, object]]) -> None:
+    conn.executemany(
+        f"INSERT INTO logs ({LOG_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [tuple(entry.get(column) for column in LOG_COLUMNS.split(", ")) for entry in entries],
+    )
+
+
+def append_log(entry: Dict[str, object]) -> None:
+    append_logs([entry])
+
+
+def append_logs(entries: List[Dict[str, object]]) -> None:
+    conn = _connect()
+    with _WRITE_LOCK, conn:
+        _insert_logs(conn, entries)
+
+
+def import_json(db_path: Path = DB_PATH, log_path: Path = LOG_FILE_PATH) -> Dict[str, int]:
+    """Copy database.json and its log history into the SQLite database.
+
+    Users, statuses and roles are upserted, so the import can be repeated;
+    log entries are only imported while the logs table is still empty.
+    """
+    data = json.loads(db_path.read_text(encoding="utf-8")) if db_path.exists() else DEFAULT_DB
+    history: List[Dict[str, object]] = list(journal.read_all())
+    if not history:
+        history = data.get("logs", [])
+        if log_path.exists():
+            legacy = json.loads(log_path.read_text(encoding="utf-8"))
+            if len(legacy) >= len(history):
+                history = legacy
+
+    ensure_database()
+    conn = _connect()
+    users = data.get("users", {}).values()
+    with _WRITE_LOCK, conn:
+        for user in users:
+            _write_user(conn, user)
+        conn.executemany(
+            "INSERT OR REPLACE INTO statuses (code, title, description, photo) VALUES (?, ?, ?, ?)",
+            [
+                (code, status.get("title", code), status.get("description", ""), status.get("photo", ""))
+                for code, status in data.get("statuses", {}).items()
+            ],
+        )
+        conn.executemany("INSERT OR IGNORE INTO admins (user_id) VALUES (?)", [(uid,) for uid in data.get("admins", [])])
+        conn.executemany("INSERT OR IGNORE INTO moderators (user_id) VALUES (?)", [(uid,) for uid in data.get("moderators", [])])
+        imported_logs = 0
+        if conn.execute("SELECT 1 FROM logs LIMIT 1").fetchone() is None:
+            _insert_logs(conn, history)
+            imported_logs = len(history)
+    _bump_status_version()
+    _bump_role_generation()
+    return {"users": len(users), "logs": imported_logs}
+
+
+if __name__ == "__main__":
+    source = Path(sys.argv[1]) if len(sys.argv) > 1 else DB_PATH
+    counts = import_json(source)
+    print(f"Imported {counts['users']} users and {counts['logs']} log entries into {SQLITE_PATH}")
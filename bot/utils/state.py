@@ -0,0 +1,188 @@
+"""Short-lived state shared by handlers: admin dialogs, subscription answers.
+
+STATE_BACKEND=memory (default) keeps it in the process. STATE_BACKEND=sqlite
+stores it in STATE_PATH so several bot processes see the same dialogs and
+cache entries.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+STATE_BACKEND = os.environ.get("STATE_BACKEND", "memory").lower()
+STATE_PATH = Path(os.environ.get("STATE_PATH", "state.sqlite3"))
+
+# In memory a namespace keeps at most STATE_MAX_ENTRIES entries, dropping the
+# least recently used ones; SQLite sweeps expired rows every
+# STATE_SWEEP_EVERY writes.
+STATE_MAX_ENTRIES = 100_000
+STATE_SWEEP_EVERY = 1000
+STATE_WORKERS = int(os.environ.get("STATE_WORKERS", "2"))
+
+_MISSING = object()
+
+
+class MemoryState:
+    # Calls never block, so the async helpers below run them inline.
+    blocking = False
+
+    def __init__(self) -> None:
+        # namespace -> key -> (value, expires at on the wall clock or None),
+        # least recently used first
+        self._data: Dict[str, "OrderedDict[str, Tuple[object, Optional[float]]]"] = {}
+
+    def get(self, namespace: str, key: str, default: object = None) -> object:
+        entries = self._data.get(namespace)
+        entry = entries.get(key) if entries is not None else None
+        if entry is None:
+            return default
+        if entry[1] is not None and entry[1] <= time.time():
+            del entries[key]
+            return default
+        entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, namespace: str, key: str, value: object, ttl: Optional[float] = None) -> None:
+        entries = self._data.setdefault(namespace, OrderedDict())
+        entries[key] = (value, time.time() + ttl if ttl is not None else None)
+        entries.move_to_end(key)
+        while len(entries) > STATE_MAX_ENTRIES:
+            entries.popitem(last=False)
+
+    def pop(self, namespace: str, key: str, default: object = None) -> object:
+        value = self.get(namespace, key, _MISSING)
+        self._data.get(namespace, {}).pop(key, None)
+        return default if value is _MISSING else value
+
+
+class SQLiteState:
+    blocking = True
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS state (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        expires_at REAL,
+        PRIMARY KEY (namespace, key)
+    ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str, default: object = None) -> object:
+        row = self._connect().execute(
+            "SELECT value FROM state WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, key, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, namespace: str, key: str, value: object, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value, ensure_ascii=False), now + ttl if ttl is not None else None),
+        )
+        self._writes += 1
+        if self._writes % STATE_SWEEP_EVERY == 0:
+            conn.execute("DELETE FROM state WHERE expires_at <= ?", (now,))
+
+    def pop(self, namespace: str, key: str, default: object = None) -> object:
+        row = self._connect().execute(
+            "DELETE FROM state WHERE namespace = ? AND key = ? RETURNING value, expires_at",
+            (namespace, key),
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return default
+        return json.loads(row[0])
+
+
+T = TypeVar("T")
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+
+async def _run(func: Callable[..., T], *args) -> T:
+    # SQLite lookups go to a small pool so handlers never wait on the
+    # database file from the event loop.
+    global _EXECUTOR
+    if not STATE.blocking:
+        return func(*args)
+    if _EXECUTOR is None:
+        _EXECUTOR = ThreadPoolExecutor(max_workers=STATE_WORKERS, thread_name_prefix="state")
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_EXECUTOR, functools.partial(func, *args))
+
+
+class Namespace:
+    """Dict-like view of one namespace; keys are stringified, values must be JSON-serialisable.
+
+    Handlers use the awaitable aget / aset / apop / acontains; the plain
+    methods block on the SQLite backend.
+    """
+
+    def __init__(self, name: str, ttl: Optional[float] = None) -> None:
+        self.name = name
+        self.ttl = ttl
+
+    def get(self, key: object, default: object = None) -> object:
+        return STATE.get(self.name, str(key), default)
+
+    def set(self, key: object, value: object, ttl: Optional[float] = None) -> None:
+        STATE.set(self.name, str(key), value, ttl if ttl is not None else self.ttl)
+
+    def pop(self, key: object, default: object = None) -> object:
+        return STATE.pop(self.name, str(key), default)
+
+    def __contains__(self, key: object) -> bool:
+        return STATE.get(self.name, str(key), _MISSING) is not _MISSING
+
+    def __getitem__(self, key: object) -> object:
+        value = STATE.get(self.name, str(key), _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: object, value: object) -> None:
+        self.set(key, value)
+
+    async def aget(self, key: object, default: object = None) -> object:
+        return await _run(self.get, key, default)
+
+    async def aset(self, key: object, value: object, ttl: Optional[float] = None) -> None:
+        await _run(self.set, key, value, ttl)
+
+    async def apop(self, key: object, default: object = None) -> object:
+        return await _run(self.pop, key, default)
+
+    async def acontains(self, key: object) -> bool:
+        return await _run(self.__contains__, key)
+
+
+def namespace(name: str, ttl: Optional[float] = None) -> Namespace:
+    return Namespace(name, ttl)
+
+
+STATE = SQLiteState(STATE_PATH) if STATE_BACKEND == "sqlite" else MemoryState()
@@ -1,6 +1,6 @@
-from typing import Dict, Optional
+from typing import Dict, Mapping, Optional
 
-from .db import get_statuses
+from .db import status_catalogue
 
 FOOTER = (
     "Группа: @ZhorikBase\n"
@@ -9,19 +9,23 @@ FOOTER = (
 )
 
 
+def statuses_snapshot() -> Mapping[str, Mapping[str, str]]:
+    return status_catalogue()[1]
+
+
 def status_photo(code: str) -> str:
-    statuses = get_statuses()
+    statuses = statuses_snapshot()
     default_photo = statuses.get("unknown", {}).get("photo", "")
     return statuses.get(code, {}).get("photo", default_photo)
 
 
 def status_title(code: str) -> str:
-    statuses = get_statuses()
+    statuses = statuses_snapshot()
     return statuses.get(code, {}).get("title", "❓ Неизвестный")
 
 
 def status_description(code: str) -> str:
-    statuses = get_statuses()
+    statuses = statuses_snapshot()
     return statuses.get(code, {}).get("description", "Нет данных — будьте осторожны.")
 
 
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import os
+import signal
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from bot.utils import notifications
+
+# Webhook mode (BOT_MODE=webhook). WEBHOOK_URL is the public base URL that is
+# registered with Telegram on startup; leave it empty to serve a local endpoint
+# only, e.g. to POST synthetic updates at it.
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL", "").rstrip("/")
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/webhook")
+WEBHOOK_HOST = os.environ.get("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", "8080"))
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "")
+WEBHOOK_DRAIN_TIMEOUT = float(os.environ.get("WEBHOOK_DRAIN_TIMEOUT", "10"))
+
+logger = logging.getLogger(__name__)
+
+
+class DrainingRequestHandler(SimpleRequestHandler):
+    """Lets updates already accepted in the background finish before the session closes."""
+
+    async def close(self) -> None:
+        pending = list(self._background_feed_update_tasks)
+        if pending:
+            logger.info("Waiting for %d in-flight updates", len(pending))
+            _, unfinished = await asyncio.wait(pending, timeout=WEBHOOK_DRAIN_TIMEOUT)
+            for task in unfinished:
+                task.cancel()
+        # This hook runs before the dispatcher's shutdown handlers, so the
+        # digests those updates queued must go out while the session is open.
+        await notifications.drain()
+        await super().close()
+
+
+def build_app(bot: Bot, dp: Dispatcher) -> web.Application:
+    if not WEBHOOK_SECRET:
+        raise RuntimeError("WEBHOOK_SECRET is not set")
+    app = web.Application()
+    DrainingRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher) -> None:
+    runner = web.AppRunner(build_app(bot, dp))
+    await runner.setup()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    try:
+        await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+        logger.info("Serving webhook on %s:%s%s", WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH)
+        if WEBHOOK_URL:
+            await bot.set_webhook(
+                f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=dp.resolve_used_update_types(),
+            )
+        await stop.wait()
+    finally:
+        # Stops accepting connections, then drains in-flight updates.
+        await runner.cleanup()